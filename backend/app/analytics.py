@@ -1,5 +1,6 @@
 ﻿import re
-from typing import Dict, List, Any
+from collections import Counter
+from typing import Dict, List, Any, Iterable
 
 def word_count(text: str) -> int:
     if not text:
@@ -11,11 +12,76 @@ def sentence_count(text: str) -> int:
     return max(1, len(re.findall(r"[.!?]+", text)))
 
 def flesch_reading_ease(text: str) -> float:
-    words = re.findall(r"\w+", text)
-    wcount = max(1, len(words))
-    s_count = sentence_count(text)
-    syllables = 0
-    for w in words:
-        syllables += max(1, len(re.findall(r"[aeiouy]+", w.lower())))
+    return text_stats(text)["flesch_reading_ease"]
+
+# One scan over the text. Alternatives never overlap \w or [.!?], so words and
+# sentence-ending runs come out exactly as word_count/sentence_count find them.
+# Matches are tallied with Counter first, so the Python-level work is per distinct
+# token (resumes repeat most words) rather than per token.
+_SCAN = re.compile(
+    r"(?P<line>^[ \t]*(?=\S))(?=(?P<bullet>[-*\u2022\u25aa\u25cf\u25e6\u2023\u2013]|\d{1,2}[.)])[ \t])?"
+    r"|(?P<word>\w+)(?P<pct>[ \t]?%)?"
+    r"|(?P<end>[.!?]+)"
+    r"|(?P<cur>[$\u20ac\u00a3\u20b9])(?=[ \t]?\d)",
+    re.MULTILINE,
+)
+_VOWEL_GROUPS = re.compile(r"[aeiouy]+")
+_MULTIPLIER = re.compile(r"\d+(?:x|k|m|mm|bn)")
+
+ACHIEVEMENT_VERBS = {
+    "reduced", "improved", "increased", "achieved", "boosted", "saved", "grew", "cut",
+    "delivered", "launched", "optimized", "optimised", "accelerated", "doubled", "tripled",
+}
+
+_syllables: Dict[str, int] = {}
+
+def _syllable_count(word: str) -> int:
+    n = _syllables.get(word)
+    if n is None:
+        if len(_syllables) > 100000:
+            _syllables.clear()
+        n = _syllables[word] = max(1, len(_VOWEL_GROUPS.findall(word.lower())))
+    return n
+
+def text_stats(text: str) -> Dict[str, Any]:
+    """Word/sentence/syllable counts, readability, bullet density and quantified-achievement markers in one pass."""
+    words = sentences = syllables = lines = bullets = quantified = verbs = 0
+    for (_, bullet, word, pct, end, cur), n in Counter(_SCAN.findall(text or "")).items():
+        if word:
+            words += n
+            syllables += n * _syllable_count(word)
+            if pct:
+                quantified += n
+            elif word[0].isdigit():
+                if _MULTIPLIER.fullmatch(word.lower()):
+                    quantified += n
+            elif word.lower() in ACHIEVEMENT_VERBS:
+                verbs += n
+        elif end:
+            sentences += n
+        elif cur:
+            quantified += n
+        else:
+            lines += n
+            if bullet:
+                bullets += n
+    wcount = max(1, words)
+    s_count = max(1, sentences)
     flesch = 206.835 - 1.015 * (wcount / s_count) - 84.6 * (syllables / wcount)
-    return round(max(0.0, min(100.0, flesch)), 1)
+    return {
+        "words": words,
+        "sentences": s_count,
+        "syllables": syllables,
+        "avg_words_per_sentence": round(wcount / s_count, 2),
+        "avg_syllables_per_word": round(syllables / wcount, 2),
+        "flesch_reading_ease": round(max(0.0, min(100.0, flesch)), 1),
+        "lines": lines,
+        "bullets": bullets,
+        "bullet_density": round(bullets / lines, 3) if lines else 0.0,
+        "quantified_markers": quantified,
+        "achievement_verbs": verbs,
+    }
+
+def text_stats_many(texts: Iterable[str]) -> List[Dict[str, Any]]:
+    """text_stats for a batch of documents (shares the per-word syllable memo)."""
+    return [text_stats(t) for t in texts]
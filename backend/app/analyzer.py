@@ -1,65 +1,48 @@
 ﻿from .suggestions_plugin import build_suggestions
-import os, re
-from typing import Optional, List, Dict
-from PyPDF2 import PdfReader
-
-SKILLS_LIST = [
-    "python","java","c","c++","javascript","react","node","express","mongodb",
-    "sql","mysql","html","css","git","docker","aws","pandas","numpy",
-    "tensorflow","scikit-learn","rest","api","typescript","tailwind","redux"
-]
-
-SOFT_SKILLS = [
-    "communication","teamwork","problem solving","leadership","time management",
-    "management","collaboration","adaptability"
-]
-
-def extract_text_from_pdf(path: str) -> str:
+from . import metrics
+from . import taxonomy
+from .pdf_text import extract_text
+from .analytics import text_stats
+import os
+from typing import Optional, Dict
+
+def extract_text_from_pdf(path: str, max_pages: int = 0, max_chars: int = 0) -> str:
     if not os.path.exists(path):
         raise RuntimeError(f"PDF path not found: {path}")
-    reader = PdfReader(path)
-    pages = []
-    for p in reader.pages:
-        t = p.extract_text()
-        if t:
-            pages.append(t)
-    return "\n".join(pages)
+    return extract_text(path, max_pages=max_pages, max_chars=max_chars, skip_empty=True)[0]
 
-def _match_words_from_list(text: str, words: List[str]) -> List[str]:
-    text_l = (text or "").lower()
-    found = []
-    for w in words:
-        if re.search(r"\b" + re.escape(w.lower()) + r"\b", text_l):
-            found.append(w)
-    return sorted(set(found))
-
-def analyze_resume(pdf_path: Optional[str] = None, pdf_text: Optional[str] = None, job_description: str = "") -> Dict:
+def analyze_resume(pdf_path: Optional[str] = None, pdf_text: Optional[str] = None, job_description: str = "",
+                   max_pages: int = 0) -> Dict:
     if pdf_text is None:
         if not pdf_path:
             raise RuntimeError("analyze_resume: either pdf_path or pdf_text must be provided")
-        text = extract_text_from_pdf(pdf_path)
+        with metrics.stage("extract"):
+            text = extract_text_from_pdf(pdf_path, max_pages=max_pages)
     else:
         text = pdf_text
 
     doc_text = text or ""
-    skills_found = _match_words_from_list(doc_text, SKILLS_LIST)
-    soft_found = _match_words_from_list(doc_text, SOFT_SKILLS)
-    jd_required = _match_words_from_list(job_description or "", SKILLS_LIST)
-
-    if jd_required:
-        matched_required = set(skills_found) & set(jd_required)
-        ats_score = int(round(100.0 * len(matched_required) / max(1, len(jd_required))))
-    else:
-        ats_score = int(round(100.0 * len(skills_found) / max(1, len(SKILLS_LIST))))
+    tax = taxonomy.current()
+    with metrics.stage("skills"):
+        skills_found, soft_found = tax.find_by_kind(doc_text)
+        jd_required = tax.find(job_description or "", "tech")
+
+    with metrics.stage("score"):
+        if jd_required:
+            matched_required = set(skills_found) & set(jd_required)
+            ats_score = int(round(100.0 * len(matched_required) / max(1, len(jd_required))))
+        else:
+            ats_score = int(round(100.0 * len(skills_found) / max(1, len(tax.tech))))
 
     missing_skills = sorted([s for s in jd_required if s not in skills_found])
 
     strengths = skills_found[:6]
 
-    try:
-        suggestions = build_suggestions(skills_found, missing_skills, strengths, doc_text)
-    except Exception as e:
-        suggestions = [f"Could not generate suggestions: {e}"]
+    with metrics.stage("suggestions"):
+        try:
+            suggestions = build_suggestions(skills_found, missing_skills, strengths, doc_text)
+        except Exception as e:
+            suggestions = [f"Could not generate suggestions: {e}"]
 
     if not skills_found:
         suggestions.append("No technical skills detected. Add a Skills or Projects section listing tech stacks.")
@@ -73,6 +56,7 @@ def analyze_resume(pdf_path: Optional[str] = None, pdf_text: Optional[str] = Non
         "missing_skills_job": missing_skills,
         "strengths": strengths,
         "suggestions": suggestions,
-        "raw_text_preview": doc_text[:1000]
+        "raw_text_preview": doc_text[:1000],
+        "text_stats": text_stats(doc_text),
     }
     return result
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+blob_store.py - content-addressed storage for uploaded PDFs
+Each distinct file is stored once at <root>/<sha[:2]>/<sha[2:4]>/<sha>.pdf. Which
+pdf_ids point at a blob, and how many, is tracked in db_store (uploads/blobs tables);
+place() and remove() are meant to run inside those transactions so a blob is never
+removed while another upload of the same content is being recorded.
+"""
+import os
+from typing import Optional
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, sha: str) -> str:
+        return os.path.join(self.root, sha[:2], sha[2:4], sha + ".pdf")
+
+    def exists(self, sha: str) -> bool:
+        return os.path.exists(self.path(sha))
+
+    def place(self, sha: str, tmp_path: Optional[str] = None, data: Optional[bytes] = None) -> bool:
+        """
+        Store content from a temp file (moved into place; same filesystem as root) or
+        from bytes. Returns False when the blob already existed (the temp file is dropped).
+        """
+        path = self.path(sha)
+        if os.path.exists(path):
+            if tmp_path is not None:
+                os.remove(tmp_path)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if tmp_path is not None:
+            os.replace(tmp_path, path)
+        else:
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return True
+
+    def remove(self, sha: str):
+        try:
+            os.remove(self.path(sha))
+        except OSError:
+            pass
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+caching.py - small size-bounded caches used by the API
+LRUCache: in-memory, evicts least recently used entries once max_bytes is exceeded
+DiskCache: one file per key under a directory; once max_bytes is exceeded it evicts the oldest files
+           down to low_water * max_bytes, so the scan over every file runs once per batch, not per put
+TextCache: extracted PDF text keyed by the SHA-256 of the PDF bytes (memory tier in front of disk tier)
+PageCache: the same per page ("<sha>-<page>"), plus the page count, so partial extractions can be resumed
+AnalysisCache: finished /analyze results keyed by (resume hash, JD hash, dictionary version),
+               memory tier in front of the analysis_cache table in db_store
+"""
+import os, threading, hashlib
+from collections import OrderedDict
+from typing import Optional, Callable, Any
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class LRUCache:
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = len):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, s) = self._data.popitem(last=False)
+                self._bytes -= s
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+                return old[0]
+            return None
+
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class DiskCache:
+    """Files live at <root>/<key[:2]>/<key><suffix>; reads touch the mtime so eviction is roughly LRU."""
+    def __init__(self, root: str, max_bytes: int, suffix: str = "", low_water: float = 0.9):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.low_water_bytes = int(max_bytes * min(1.0, max(0.0, low_water)))
+        self.suffix = suffix
+        self._index = None  # key -> (size, mtime), built lazily from the directory
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + self.suffix)
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        self._bytes = 0
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.listdir(self.root):
+            sdir = os.path.join(self.root, shard)
+            if not os.path.isdir(sdir):
+                continue
+            for name in os.listdir(sdir):
+                if self.suffix and not name.endswith(self.suffix):
+                    continue
+                try:
+                    st = os.stat(os.path.join(sdir, name))
+                except OSError:
+                    continue
+                key = name[:len(name) - len(self.suffix)] if self.suffix else name
+                self._index[key] = (st.st_size, st.st_mtime)
+                self._bytes += st.st_size
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._load_index()
+            old = self._index.get(key)
+            if old is not None:
+                self._bytes -= old[0]
+            self._index[key] = (len(data), os.path.getmtime(path))
+            self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._load_index()
+            old = self._index.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0]
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        # oldest mtime first, down to the low-water mark; refresh from disk since other
+        # processes may have touched the files
+        for key in list(self._index):
+            try:
+                self._index[key] = (self._index[key][0], os.path.getmtime(self._path(key)))
+            except OSError:
+                self._bytes -= self._index.pop(key)[0]
+        for key, (size, _) in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if self._bytes <= self.low_water_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._index[key]
+            self._bytes -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._load_index()
+            return {"entries": len(self._index), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class TextCache:
+    def __init__(self, root: str, max_memory_bytes: int, max_disk_bytes: int):
+        self.memory = LRUCache(max_memory_bytes)
+        self.disk = DiskCache(root, max_disk_bytes, suffix=".txt")
+
+    def get(self, sha: str) -> Optional[str]:
+        text = self.memory.get(sha)
+        if text is not None:
+            return text
+        data = self.disk.get(sha)
+        if data is None:
+            return None
+        text = data.decode("utf-8")
+        self.memory.put(sha, text)
+        return text
+
+    def put(self, sha: str, text: str):
+        self.memory.put(sha, text)
+        self.disk.put(sha, text.encode("utf-8"))
+
+    def stats(self) -> dict:
+        mem, disk = self.memory.stats(), self.disk.stats()
+        lookups = mem["hits"] + mem["misses"]
+        hits = mem["hits"] + disk["hits"]
+        return {"memory": mem, "disk": disk, "hits": hits, "misses": disk["misses"],
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0}
+
+class PageCache:
+    """Per-page text for page-wise extraction; safe to use from worker processes (disk tier is shared)."""
+    def __init__(self, root: str, max_memory_bytes: int, max_disk_bytes: int):
+        self.text = TextCache(root, max_memory_bytes, max_disk_bytes)
+
+    def get_page(self, sha: str, page: int) -> Optional[str]:
+        return self.text.get(f"{sha}-{page}")
+
+    def put_page(self, sha: str, page: int, text: str):
+        self.text.put(f"{sha}-{page}", text)
+
+    def get_count(self, sha: str) -> Optional[int]:
+        n = self.text.get(f"{sha}-n")
+        return int(n) if n is not None else None
+
+    def put_count(self, sha: str, n: int):
+        self.text.put(f"{sha}-n", str(n))
+
+    def stats(self) -> dict:
+        return self.text.stats()
+
+def _result_size(result: dict) -> int:
+    return 512 + sum(len(v) if isinstance(v, str) else 64 * len(v) if isinstance(v, list) else 16
+                     for v in result.values())
+
+class AnalysisCache:
+    def __init__(self, max_memory_bytes: int, store=None):
+        self.memory = LRUCache(max_memory_bytes, sizeof=_result_size)
+        self.store = store  # module/object with get_cached_result(key) and put_cached_result(key, result)
+        self.store_hits = 0
+        self.store_misses = 0
+
+    @staticmethod
+    def make_key(resume_sha: str, jd_sha: str, dict_version: str) -> str:
+        return hashlib.sha256("\0".join((resume_sha, jd_sha, dict_version)).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        result = self.memory.get(key)
+        if result is not None or self.store is None:
+            return result
+        result = self.store.get_cached_result(key)
+        if result is None:
+            self.store_misses += 1
+            return None
+        self.store_hits += 1
+        self.memory.put(key, result)
+        return result
+
+    def put(self, key: str, result: dict):
+        self.memory.put(key, result)
+        if self.store is not None:
+            self.store.put_cached_result(key, result)
+
+    def stats(self) -> dict:
+        return {"memory": self.memory.stats(), "store_hits": self.store_hits, "store_misses": self.store_misses}
@@ -1,46 +1,539 @@
 ﻿# -*- coding: utf-8 -*-
 """
 db_store.py - simple SQLite storage for uploads and analyses
-schema (single file): analyses(id TEXT PRIMARY KEY, pdf_id, filename, path, result JSON, created_ts)
+schema (single file): analyses(id TEXT PRIMARY KEY, pdf_id, filename, path, result JSON, created_ts,
+                                ats_score, result_z zlib(JSON), preview_z zlib(raw_text_preview))
+new rows store the result compressed in result_z (preview split out into preview_z); `result` is only
+read for rows written before that. Listing/filtering uses created_ts/ats_score columns, never the blobs.
+analysis_cache(key TEXT PRIMARY KEY, result_z, created_ts, version) backs the memoized /analyze results;
+it is pruned on insert: rows older than ANALYSIS_CACHE_TTL_SECONDS, beyond ANALYSIS_CACHE_MAX_ROWS, or
+written under a taxonomy version other than the newest one seen.
+jobs(id TEXT PRIMARY KEY, title, job_description, created_ts) holds JDs registered via /jobs.
+uploads(pdf_id TEXT PRIMARY KEY, sha, filename, size, created_ts) maps opaque upload ids to content blobs;
+blobs(sha TEXT PRIMARY KEY, size, refcount, created_ts) counts the uploads sharing each stored file.
+bulk_runs(id, status, job_id, max_pages, total, completed, failed, ...) and bulk_items(bulk_id, seq, pdf_id,
+status, attempts, lease_owner, lease_until, finished_no, result_z) are the durable queue behind /bulk:
+items are leased to a dispatcher for a while and become claimable again if the lease runs out unfinished.
+connections are reused per thread, in WAL mode; the schema is created once per process
+the public read/write functions are timed as db.<name> stages (see metrics.py)
 """
-import sqlite3, json, os, time
-DB_PATH = os.path.join(os.getcwd(), "backend", "analyses.db")
+import sqlite3, json, os, time, threading, zlib
+from . import metrics
+DB_PATH = os.getenv("ANALYSES_DB", os.path.join(os.getcwd(), "backend", "analyses.db"))
 os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+MEMO_MAX_ROWS = int(os.getenv("ANALYSIS_CACHE_MAX_ROWS", 100000))
+MEMO_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+MEMO_PRUNE_EVERY = int(os.getenv("ANALYSIS_CACHE_PRUNE_EVERY", 256))
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+_all_conns = []
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+def _init_schema(conn):
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        conn.execute("""CREATE TABLE IF NOT EXISTS analyses(
+            id TEXT PRIMARY KEY,
+            pdf_id TEXT,
+            filename TEXT,
+            path TEXT,
+            result TEXT,
+            created_ts REAL
+        )""")
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(analyses)")}
+        added = False
+        for name, decl in (("ats_score", "INTEGER"), ("result_z", "BLOB"), ("preview_z", "BLOB")):
+            if name not in cols:
+                conn.execute(f"ALTER TABLE analyses ADD COLUMN {name} {decl}")
+                added = True
+        if added:
+            _backfill_scores(conn)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_ts, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_score ON analyses(ats_score)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS analysis_cache(
+            key TEXT PRIMARY KEY,
+            result_z BLOB,
+            created_ts REAL
+        )""")
+        if "version" not in {r[1] for r in conn.execute("PRAGMA table_info(analysis_cache)")}:
+            conn.execute("ALTER TABLE analysis_cache ADD COLUMN version TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_created ON analysis_cache(created_ts)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS jobs(
+            id TEXT PRIMARY KEY,
+            title TEXT,
+            job_description TEXT,
+            created_ts REAL
+        )""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS uploads(
+            pdf_id TEXT PRIMARY KEY,
+            sha TEXT NOT NULL,
+            filename TEXT,
+            size INTEGER,
+            created_ts REAL
+        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_sha ON uploads(sha)")
+        conn.execute("""CREATE TABLE IF NOT EXISTS blobs(
+            sha TEXT PRIMARY KEY,
+            size INTEGER,
+            refcount INTEGER NOT NULL,
+            created_ts REAL
+        )""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS bulk_runs(
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            job_id TEXT NOT NULL,
+            max_pages INTEGER,
+            total INTEGER NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            created_ts REAL,
+            updated_ts REAL
+        )""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS bulk_items(
+            bulk_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            pdf_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_until REAL,
+            finished_no INTEGER,
+            result_z BLOB,
+            PRIMARY KEY(bulk_id, seq)
+        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_bulk_items_status ON bulk_items(status, lease_until)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_bulk_items_finished ON bulk_items(bulk_id, finished_no)")
+        conn.commit()
+        _schema_ready = True
+
+def _backfill_scores(conn):
+    rows = conn.execute("SELECT id, result FROM analyses WHERE result IS NOT NULL AND ats_score IS NULL").fetchall()
+    for id, raw in rows:
+        try:
+            score = _score_of(json.loads(raw))
+        except ValueError:
+            continue
+        conn.execute("UPDATE analyses SET ats_score=? WHERE id=?", (score, id))
 
 def _conn():
+    """One connection per thread (and per process, so forked workers never share a handle)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
     conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.execute("""CREATE TABLE IF NOT EXISTS analyses(
-        id TEXT PRIMARY KEY,
-        pdf_id TEXT,
-        filename TEXT,
-        path TEXT,
-        result TEXT,
-        created_ts REAL
-    )""")
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    _init_schema(conn)
+    _local.conn = conn
+    _local.pid = os.getpid()
+    _all_conns.append(conn)
     return conn
 
+def close_all():
+    while _all_conns:
+        try:
+            _all_conns.pop().close()
+        except Exception:
+            pass
+    _local.conn = None
+
+def pack_json(obj) -> bytes:
+    return zlib.compress(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+def unpack_json(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+def _score_of(result):
+    if not isinstance(result, dict):
+        return None
+    if isinstance(result.get("analysis"), dict):
+        result = result["analysis"]
+    score = result.get("ats_score")
+    return int(score) if isinstance(score, (int, float)) else None
+
+def _split_preview(result):
+    """(result without raw_text_preview, preview) - handles both flat and {"analysis": {...}} shapes."""
+    if not isinstance(result, dict):
+        return result, None
+    if isinstance(result.get("analysis"), dict) and "raw_text_preview" in result["analysis"]:
+        inner = dict(result["analysis"])
+        preview = inner.pop("raw_text_preview")
+        return dict(result, analysis=inner), preview
+    if "raw_text_preview" in result:
+        rest = dict(result)
+        return rest, rest.pop("raw_text_preview")
+    return result, None
+
+def _merge_preview(result, preview):
+    if preview is None or not isinstance(result, dict):
+        return result
+    if isinstance(result.get("analysis"), dict):
+        return dict(result, analysis=dict(result["analysis"], raw_text_preview=preview))
+    return dict(result, raw_text_preview=preview)
+
+INSERT_SQL = ("INSERT OR REPLACE INTO analyses(id,pdf_id,filename,path,result,created_ts,ats_score,result_z,preview_z) "
+              "VALUES(?,?,?,?,NULL,?,?,?,?)")
+
+def _row_params(id, pdf_id, filename, path, result, ts=None):
+    body, preview = _split_preview(result)
+    return (id, pdf_id, filename, path, ts or time.time(), _score_of(result), pack_json(body),
+            zlib.compress(preview.encode("utf-8")) if preview is not None else None)
+
+@metrics.timed("db.save_analysis")
 def save_analysis(id:str, pdf_id:str, filename:str, path:str, result:dict):
     conn = _conn()
-    cur = conn.cursor()
-    cur.execute("INSERT OR REPLACE INTO analyses(id,pdf_id,filename,path,result,created_ts) VALUES(?,?,?,?,?,?)",
-                (id,pdf_id,filename,path,json.dumps(result, ensure_ascii=False), time.time()))
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute(INSERT_SQL, _row_params(id, pdf_id, filename, path, result))
+
+@metrics.timed("db.save_analyses")
+def save_analyses(rows):
+    """
+    Bulk insert in a single transaction. rows: iterable of dicts with keys
+    id, pdf_id, filename, path, result (and optionally created_ts).
+    """
+    params = [_row_params(r["id"], r.get("pdf_id"), r.get("filename"), r.get("path"), r.get("result"),
+                          r.get("created_ts")) for r in rows]
+    if not params:
+        return 0
+    conn = _conn()
+    with conn:
+        conn.executemany(INSERT_SQL, params)
+    return len(params)
+
+def _encode_cursor(ts, id):
+    return f"{ts!r}|{id}"
+
+def _decode_cursor(cursor):
+    ts, _, id = cursor.partition("|")
+    return float(ts), id
+
+@metrics.timed("db.list_analyses_page")
+def list_analyses_page(limit=100, cursor=None, min_score=None, max_score=None):
+    """
+    Newest first, keyset-paginated on (created_ts, id). Pass the returned next_cursor
+    back as `cursor` to get the following page; next_cursor is None on the last page.
+    """
+    where, params = [], []
+    if cursor:
+        ts, id = _decode_cursor(cursor)
+        where.append("(created_ts, id) < (?, ?)")
+        params += [ts, id]
+    if min_score is not None:
+        where.append("ats_score >= ?")
+        params.append(min_score)
+    if max_score is not None:
+        where.append("ats_score <= ?")
+        params.append(max_score)
+    sql = "SELECT id,pdf_id,filename,created_ts,ats_score FROM analyses"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_ts DESC, id DESC LIMIT ?"
+    rows = _conn().execute(sql, params + [limit]).fetchall()
+    items = [{"id":r[0],"pdf_id":r[1],"filename":r[2],"created_ts":r[3],"ats_score":r[4]} for r in rows]
+    next_cursor = _encode_cursor(rows[-1][3], rows[-1][0]) if len(rows) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
 
 def list_analyses(limit=100):
+    return list_analyses_page(limit)["items"]
+
+@metrics.timed("db.get_analysis")
+def get_analysis(id:str, include_preview:bool=True):
+    cols = "id,pdf_id,filename,path,result,created_ts,result_z" + (",preview_z" if include_preview else "")
+    r = _conn().execute(f"SELECT {cols} FROM analyses WHERE id=?", (id,)).fetchone()
+    if not r:
+        return None
+    if r[6] is not None:
+        result = unpack_json(r[6])
+        if include_preview and r[7] is not None:
+            result = _merge_preview(result, zlib.decompress(r[7]).decode("utf-8"))
+    else:
+        result = json.loads(r[4] or "{}")
+        if not include_preview:
+            result = _split_preview(result)[0]
+    return {"id":r[0],"pdf_id":r[1],"filename":r[2],"path":r[3],"result": result, "created_ts": r[5]}
+
+@metrics.timed("db.get_cached_result")
+def get_cached_result(key:str):
+    r = _conn().execute("SELECT result_z FROM analysis_cache WHERE key=?", (key,)).fetchone()
+    return unpack_json(r[0]) if r else None
+
+_memo_lock = threading.Lock()
+_memo_puts = 0
+_memo_version = None
+
+@metrics.timed("db.put_cached_result")
+def put_cached_result(key:str, result:dict):
+    """Memoize a result; every MEMO_PRUNE_EVERY puts, or when the taxonomy version changes, prune the table."""
+    global _memo_puts, _memo_version
+    version = result.get("taxonomy_version")
     conn = _conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id,pdf_id,filename,created_ts FROM analyses ORDER BY created_ts DESC LIMIT ?", (limit,))
-    rows = cur.fetchall()
-    conn.close()
-    return [{"id":r[0],"pdf_id":r[1],"filename":r[2],"created_ts":r[3]} for r in rows]
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO analysis_cache(key,result_z,created_ts,version) VALUES(?,?,?,?)",
+                     (key, pack_json(result), time.time(), version))
+    with _memo_lock:
+        _memo_puts += 1
+        changed = version is not None and version != _memo_version
+        if changed:
+            _memo_version = version
+        due = changed or _memo_puts % max(1, MEMO_PRUNE_EVERY) == 0
+    if due:
+        prune_cached_results(version if changed else None)
 
-def get_analysis(id:str):
+@metrics.timed("db.prune_cached_results")
+def prune_cached_results(current_version:str=None) -> int:
+    """
+    Drop memoized results past MEMO_TTL_SECONDS, all but the newest MEMO_MAX_ROWS, and (given
+    current_version) every row from another taxonomy version. Returns the number of rows removed.
+    """
     conn = _conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id,pdf_id,filename,path,result,created_ts FROM analyses WHERE id=?", (id,))
-    r = cur.fetchone()
-    conn.close()
+    removed = 0
+    with conn:
+        removed += conn.execute("DELETE FROM analysis_cache WHERE created_ts<?",
+                                (time.time() - MEMO_TTL_SECONDS,)).rowcount
+        if current_version is not None:
+            removed += conn.execute("DELETE FROM analysis_cache WHERE version IS NOT ?",
+                                    (current_version,)).rowcount
+        removed += conn.execute(
+            "DELETE FROM analysis_cache WHERE created_ts<"
+            "(SELECT created_ts FROM analysis_cache ORDER BY created_ts DESC LIMIT 1 OFFSET ?)",
+            (max(0, MEMO_MAX_ROWS - 1),)).rowcount
+    return removed
+
+@metrics.timed("db.save_job")
+def save_job(id:str, title:str, job_description:str):
+    conn = _conn()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO jobs(id,title,job_description,created_ts) VALUES(?,?,?,?)",
+                     (id, title, job_description, time.time()))
+
+@metrics.timed("db.get_job")
+def get_job(id:str):
+    r = _conn().execute("SELECT id,title,job_description,created_ts FROM jobs WHERE id=?", (id,)).fetchone()
     if not r:
         return None
-    return {"id":r[0],"pdf_id":r[1],"filename":r[2],"path":r[3],"result": json.loads(r[4] or "{}"), "created_ts": r[5]}
+    return {"id":r[0],"title":r[1],"job_description":r[2],"created_ts":r[3]}
+
+@metrics.timed("db.list_jobs")
+def list_jobs(limit=100):
+    rows = _conn().execute("SELECT id,title,created_ts FROM jobs ORDER BY created_ts DESC LIMIT ?", (limit,)).fetchall()
+    return [{"id":r[0],"title":r[1],"created_ts":r[2]} for r in rows]
+
+@metrics.timed("db.delete_job")
+def delete_job(id:str) -> bool:
+    conn = _conn()
+    with conn:
+        cur = conn.execute("DELETE FROM jobs WHERE id=?", (id,))
+    return cur.rowcount > 0
+
+@metrics.timed("db.add_upload")
+def add_upload(pdf_id:str, sha:str, filename:str, size:int, place_blob=None) -> bool:
+    """
+    Record an upload and take a reference on its blob. place_blob() (storing the file)
+    runs inside the same write transaction, so it cannot race a delete of the last
+    reference. Returns True if this content was new.
+    """
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        now = time.time()
+        new = conn.execute("UPDATE blobs SET refcount=refcount+1 WHERE sha=?", (sha,)).rowcount == 0
+        if new:
+            conn.execute("INSERT INTO blobs(sha,size,refcount,created_ts) VALUES(?,?,1,?)", (sha, size, now))
+        conn.execute("INSERT INTO uploads(pdf_id,sha,filename,size,created_ts) VALUES(?,?,?,?,?)",
+                     (pdf_id, sha, filename, size, now))
+        if place_blob is not None:
+            place_blob()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return new
+
+@metrics.timed("db.get_upload")
+def get_upload(pdf_id:str):
+    r = _conn().execute("SELECT pdf_id,sha,filename,size,created_ts FROM uploads WHERE pdf_id=?", (pdf_id,)).fetchone()
+    if not r:
+        return None
+    return {"pdf_id":r[0],"sha":r[1],"filename":r[2],"size":r[3],"created_ts":r[4]}
+
+@metrics.timed("db.list_uploads")
+def list_uploads():
+    rows = _conn().execute("SELECT pdf_id,sha FROM uploads ORDER BY created_ts, pdf_id").fetchall()
+    return [{"pdf_id":r[0],"sha":r[1]} for r in rows]
+
+@metrics.timed("db.delete_upload")
+def delete_upload(pdf_id:str, remove_blob=None):
+    """
+    Drop an upload and its blob reference; remove_blob(sha) runs (inside the transaction)
+    when that was the last one. Returns the upload's sha, or None if it did not exist.
+    """
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        r = conn.execute("SELECT sha FROM uploads WHERE pdf_id=?", (pdf_id,)).fetchone()
+        if r is None:
+            conn.rollback()
+            return None
+        sha = r[0]
+        conn.execute("DELETE FROM uploads WHERE pdf_id=?", (pdf_id,))
+        conn.execute("UPDATE blobs SET refcount=refcount-1 WHERE sha=?", (sha,))
+        if conn.execute("DELETE FROM blobs WHERE sha=? AND refcount<=0", (sha,)).rowcount and remove_blob is not None:
+            remove_blob(sha)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return sha
+
+@metrics.timed("db.blob_stats")
+def blob_stats():
+    uploads, = _conn().execute("SELECT COUNT(*) FROM uploads").fetchone()
+    blobs, stored = _conn().execute("SELECT COUNT(*), COALESCE(SUM(size),0) FROM blobs").fetchone()
+    logical, = _conn().execute("SELECT COALESCE(SUM(size),0) FROM uploads").fetchone()
+    return {"uploads": uploads, "blobs": blobs, "stored_bytes": stored, "uploaded_bytes": logical}
+
+# ---- bulk queue ----
+
+@metrics.timed("db.create_bulk_run")
+def create_bulk_run(id:str, job_id:str, pdf_ids, max_pages:int=0):
+    now = time.time()
+    conn = _conn()
+    with conn:
+        conn.execute("INSERT INTO bulk_runs(id,status,job_id,max_pages,total,created_ts,updated_ts) VALUES(?,?,?,?,?,?,?)",
+                     (id, "queued", job_id, max_pages, len(pdf_ids), now, now))
+        conn.executemany("INSERT INTO bulk_items(bulk_id,seq,pdf_id,status) VALUES(?,?,?,'queued')",
+                         [(id, seq, pdf_id) for seq, pdf_id in enumerate(pdf_ids)])
+
+def _bulk_row(r):
+    return {"bulk_id":r[0],"status":r[1],"job_id":r[2],"max_pages":r[3],"total":r[4],"completed":r[5],
+            "failed":r[6],"created_ts":r[7],"updated_ts":r[8]}
+
+BULK_COLS = "id,status,job_id,max_pages,total,completed,failed,created_ts,updated_ts"
+
+@metrics.timed("db.get_bulk_run")
+def get_bulk_run(id:str):
+    r = _conn().execute(f"SELECT {BULK_COLS} FROM bulk_runs WHERE id=?", (id,)).fetchone()
+    return _bulk_row(r) if r else None
+
+@metrics.timed("db.list_bulk_runs")
+def list_bulk_runs(limit=100):
+    rows = _conn().execute(f"SELECT {BULK_COLS} FROM bulk_runs ORDER BY created_ts DESC LIMIT ?", (limit,)).fetchall()
+    return [_bulk_row(r) for r in rows]
+
+def _finish_item(conn, bulk_id, seq, ok, result, now):
+    """Record one finished item (inside a transaction) and close the run once nothing is left."""
+    completed, failed = conn.execute("SELECT completed, failed FROM bulk_runs WHERE id=?", (bulk_id,)).fetchone()
+    conn.execute("UPDATE bulk_items SET status=?, lease_owner=NULL, lease_until=NULL, finished_no=?, result_z=? "
+                 "WHERE bulk_id=? AND seq=?",
+                 ("done" if ok else "error", completed + failed + 1, pack_json(result), bulk_id, seq))
+    col = "completed" if ok else "failed"
+    conn.execute(f"UPDATE bulk_runs SET {col}={col}+1, updated_ts=?, "
+                 "status=CASE WHEN status IN ('queued','running') AND completed+failed+1>=total THEN 'done' ELSE status END "
+                 "WHERE id=?", (now, bulk_id))
+
+_CLAIMABLE = ("FROM bulk_items i JOIN bulk_runs r ON r.id=i.bulk_id "
+              "WHERE (i.status='queued' OR (i.status='leased' AND i.lease_until<?)) AND r.status IN ('queued','running')")
+
+@metrics.timed("db.bulk_items_claimable")
+def bulk_items_claimable() -> bool:
+    """Read-only check for queued or lease-expired items, so an idle dispatcher skips the write transaction."""
+    return _conn().execute(f"SELECT 1 {_CLAIMABLE} LIMIT 1", (time.time(),)).fetchone() is not None
+
+@metrics.timed("db.claim_bulk_items")
+def claim_bulk_items(owner:str, limit:int, lease_seconds:float, max_attempts:int=3):
+    """
+    Lease up to `limit` claimable items (queued, or leased with an expired lease) of open
+    runs, oldest run first. Items whose lease already ran out max_attempts times are
+    failed instead of handed out again. Returns [{bulk_id, seq, pdf_id, job_id, max_pages}].
+    """
+    if limit <= 0:
+        return []
+    now = time.time()
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            f"SELECT i.bulk_id, i.seq, i.pdf_id, i.attempts, r.job_id, r.max_pages {_CLAIMABLE} "
+            "ORDER BY r.created_ts, i.bulk_id, i.seq LIMIT ?", (now, limit)).fetchall()
+        claimed = []
+        for bulk_id, seq, pdf_id, attempts, job_id, max_pages in rows:
+            if attempts >= max_attempts:
+                _finish_item(conn, bulk_id, seq, False,
+                             {"pdf_id": pdf_id, "error": f"Gave up after {attempts} unfinished attempts."}, now)
+                continue
+            conn.execute("UPDATE bulk_items SET status='leased', attempts=attempts+1, lease_owner=?, lease_until=? "
+                         "WHERE bulk_id=? AND seq=?", (owner, now + lease_seconds, bulk_id, seq))
+            conn.execute("UPDATE bulk_runs SET status='running', updated_ts=? WHERE id=? AND status='queued'", (now, bulk_id))
+            claimed.append({"bulk_id": bulk_id, "seq": seq, "pdf_id": pdf_id, "job_id": job_id, "max_pages": max_pages})
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return claimed
+
+@metrics.timed("db.renew_bulk_leases")
+def renew_bulk_leases(owner:str, lease_seconds:float) -> int:
+    conn = _conn()
+    with conn:
+        cur = conn.execute("UPDATE bulk_items SET lease_until=? WHERE status='leased' AND lease_owner=?",
+                           (time.time() + lease_seconds, owner))
+    return cur.rowcount
+
+@metrics.timed("db.finish_bulk_item")
+def finish_bulk_item(bulk_id:str, seq:int, owner:str, result:dict, ok:bool=True) -> bool:
+    """Store an item's result; False if `owner` no longer holds its lease (someone else took it over)."""
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        held = conn.execute("SELECT 1 FROM bulk_items WHERE bulk_id=? AND seq=? AND status='leased' AND lease_owner=?",
+                            (bulk_id, seq, owner)).fetchone()
+        if held:
+            _finish_item(conn, bulk_id, seq, ok, result, time.time())
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return held is not None
+
+@metrics.timed("db.release_bulk_item")
+def release_bulk_item(bulk_id:str, seq:int, owner:str):
+    """Hand a leased item back without counting the attempt (e.g. the worker pool was full)."""
+    conn = _conn()
+    with conn:
+        conn.execute("UPDATE bulk_items SET status='queued', attempts=MAX(attempts-1,0), lease_owner=NULL, lease_until=NULL "
+                     "WHERE bulk_id=? AND seq=? AND status='leased' AND lease_owner=?", (bulk_id, seq, owner))
+
+@metrics.timed("db.bulk_results")
+def bulk_results(bulk_id:str, after:int=0, limit:int=100):
+    """Finished items in completion order: [(finished_no, seq, result)] with finished_no > after."""
+    rows = _conn().execute("SELECT finished_no, seq, result_z FROM bulk_items WHERE bulk_id=? AND finished_no>? "
+                           "ORDER BY finished_no LIMIT ?", (bulk_id, after, limit)).fetchall()
+    return [(r[0], r[1], unpack_json(r[2])) for r in rows]
+
+@metrics.timed("db.live_bulk_leases")
+def live_bulk_leases(bulk_id:str) -> int:
+    """Items of a run still leased to a worker whose lease has not run out (their results may yet arrive)."""
+    n, = _conn().execute("SELECT COUNT(*) FROM bulk_items WHERE bulk_id=? AND status='leased' AND lease_until>=?",
+                         (bulk_id, time.time())).fetchone()
+    return n
+
+@metrics.timed("db.cancel_bulk_run")
+def cancel_bulk_run(id:str) -> bool:
+    """Stop handing out a run's items; ones already leased still report their results."""
+    conn = _conn()
+    with conn:
+        cur = conn.execute("UPDATE bulk_runs SET status='cancelled', updated_ts=? WHERE id=? AND status IN ('queued','running')",
+                           (time.time(), id))
+        conn.execute("UPDATE bulk_items SET status='cancelled' WHERE bulk_id=? AND status='queued'", (id,))
+    return cur.rowcount > 0
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+embed_sidecar.py - one embedding model shared by every API worker over a Unix socket
+
+    cd backend
+    python -m app.embed_sidecar                  # serves on EMBED_SIDECAR_SOCKET
+
+The sidecar loads the sentence-transformers model once. semantic.embed_texts()
+sends texts that are not already in the on-disk embedding store here, and
+falls back to loading the model in-process when the socket is missing or the
+sidecar does not answer. Requests that arrive within EMBED_SIDECAR_WINDOW_MS
+of each other are merged, deduplicated and encoded as one batch.
+
+Wire format, both directions: a 4-byte big-endian length, then a JSON header
+of that length, then header["nbytes"] raw bytes (float32 vectors, row-major)
+when the header has that key.
+"""
+import os, sys, json, time, socket, struct, asyncio, logging, argparse
+from typing import List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+log = logging.getLogger(__name__)
+
+# "" disables the sidecar client entirely
+SOCKET_PATH = os.getenv("EMBED_SIDECAR_SOCKET", os.path.join(os.getenv("CACHE_DIR", "cache"), "embed.sock"))
+TIMEOUT = float(os.getenv("EMBED_SIDECAR_TIMEOUT", 30.0))
+WINDOW_MS = float(os.getenv("EMBED_SIDECAR_WINDOW_MS", 5.0))
+MAX_BATCH = int(os.getenv("EMBED_SIDECAR_MAX_BATCH", 256))
+
+_HEADER = struct.Struct(">I")
+
+# ---- client (API workers) ----
+
+def available() -> bool:
+    return bool(SOCKET_PATH) and np is not None and os.path.exists(SOCKET_PATH)
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        part = sock.recv(n - len(buf))
+        if not part:
+            raise ConnectionError("embedding sidecar closed the connection")
+        buf += part
+    return bytes(buf)
+
+def _call(request: dict) -> Tuple[dict, bytes]:
+    body = json.dumps(request, ensure_ascii=False).encode("utf-8")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(TIMEOUT)
+        sock.connect(SOCKET_PATH)
+        sock.sendall(_HEADER.pack(len(body)) + body)
+        header = json.loads(_recv_exact(sock, _HEADER.unpack(_recv_exact(sock, 4))[0]))
+        payload = _recv_exact(sock, header["nbytes"]) if header.get("nbytes") else b""
+    return header, payload
+
+_warned = set()
+
+def _warn_once(reason: str):
+    if reason not in _warned:
+        _warned.add(reason)
+        log.warning("embedding sidecar unavailable, encoding in-process: %s", reason)
+
+def encode(texts: List[str], model_name: str):
+    """(n, dim) float32 vectors from the sidecar, or None if it is absent, unreachable or serves another model."""
+    if not texts or not available():
+        return None
+    try:
+        header, payload = _call({"op": "embed", "model": model_name, "texts": list(texts)})
+    except (OSError, ValueError) as e:
+        _warn_once(str(e))
+        return None
+    if "error" in header:
+        _warn_once(header["error"])
+        return None
+    return np.frombuffer(payload, dtype=np.float32).reshape(header["n"], header["dim"])
+
+def status() -> Optional[dict]:
+    """The sidecar's model and batching counters, or None if it does not answer."""
+    if not available():
+        return None
+    try:
+        return _call({"op": "status"})[0]
+    except (OSError, ValueError):
+        return None
+
+# ---- server ----
+
+class Batcher:
+    """Collects concurrent embed requests for up to `window` seconds (or max_batch texts) and encodes them together."""
+    def __init__(self, model, window: float = WINDOW_MS / 1000.0, max_batch: int = MAX_BATCH):
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.encoded = 0
+
+    async def submit(self, texts: List[str]):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, fut))
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            n = len(pending[0][0])
+            deadline = loop.time() + self.window
+            while n < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                n += len(item[0])
+            # requests keep queueing while this batch encodes and form the next one
+            unique = list(dict.fromkeys(t for texts, _ in pending for t in texts))
+            try:
+                vecs = await loop.run_in_executor(None, self._encode, unique)
+            except Exception as e:
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            row = {t: i for i, t in enumerate(unique)}
+            for texts, fut in pending:
+                if not fut.done():
+                    fut.set_result(vecs[[row[t] for t in texts]])
+            self.requests += len(pending)
+            self.batches += 1
+            self.texts += n
+            self.encoded += len(unique)
+
+    def _encode(self, texts: List[str]):
+        vecs = self.model.encode(texts, batch_size=min(len(texts), self.max_batch),
+                                 convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(vecs, dtype=np.float32)
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "batches": self.batches, "texts": self.texts, "encoded": self.encoded,
+                "queued": self.queue.qsize()}
+
+async def _reply(writer, header: dict, payload: bytes = b""):
+    if payload:
+        header = dict(header, nbytes=len(payload))
+    body = json.dumps(header).encode("utf-8")
+    writer.write(_HEADER.pack(len(body)) + body + payload)
+    await writer.drain()
+
+async def serve(path: str, model, model_name: str):
+    batcher = Batcher(model)
+    started = time.time()
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    size = _HEADER.unpack(await reader.readexactly(4))[0]
+                except asyncio.IncompleteReadError:
+                    return
+                request = json.loads(await reader.readexactly(size))
+                if request.get("op") == "status":
+                    await _reply(writer, {"model": model_name, "uptime_seconds": round(time.time() - started, 1),
+                                          "window_ms": batcher.window * 1000, **batcher.stats()})
+                elif request.get("model") != model_name:
+                    await _reply(writer, {"error": f"sidecar serves {model_name}, not {request.get('model')}"})
+                else:
+                    try:
+                        vecs = await batcher.submit(request["texts"])
+                    except Exception as e:
+                        await _reply(writer, {"error": f"encode failed: {e}"})
+                        continue
+                    await _reply(writer, {"n": int(vecs.shape[0]), "dim": int(vecs.shape[1])}, vecs.tobytes())
+        except (ConnectionError, ValueError, KeyError) as e:
+            log.warning("embedding sidecar: dropping connection: %s", e)
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.remove(path)  # stale socket from a previous run
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    server = await asyncio.start_unix_server(handle, path=path)
+    os.chmod(path, 0o660)
+    batch_task = asyncio.create_task(batcher.run())
+    log.info("embedding sidecar: serving %s on %s", model_name, path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+        if os.path.exists(path):
+            os.remove(path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared embedding model server for the API workers")
+    parser.add_argument("--socket", default=SOCKET_PATH or os.path.join("cache", "embed.sock"))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from . import semantic
+    model = semantic._load_model()
+    if model is None:
+        print(f"embedding sidecar: cannot load {semantic.MODEL_NAME}: {semantic.model_status()['error'] or 'sentence-transformers is not installed'}")
+        return 1
+    semantic.warm_up()
+    try:
+        asyncio.run(serve(args.socket, model, semantic.MODEL_NAME))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
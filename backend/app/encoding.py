@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+encoding.py - response content negotiation: MessagePack bodies and br/gzip compression
+negotiated() renders a payload as MessagePack when the request's Accept header asks
+for it and msgpack is installed, and as compact JSON otherwise. Either way the
+payload goes straight to the encoder, without FastAPI's jsonable_encoder pass.
+CompressionMiddleware compresses complete responses of at least COMPRESS_MIN_BYTES.
+It uses brotli when that is installed and preferred, gzip otherwise, as the
+Accept-Encoding header allows. Streamed responses (NDJSON/SSE) pass through
+unchanged so events are not held back in a compressor buffer.
+brotli and msgpack are optional; without them those encodings are simply not offered
+(available() reports which ones are, for /stats and the startup log).
+"""
+import os, gzip
+from typing import Dict, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+def available() -> Dict[str, bool]:
+    return {"msgpack": msgpack is not None, "brotli": brotli is not None, "gzip": True}
+
+def parse_accept(value: str) -> Dict[str, float]:
+    """{token: q} from an Accept / Accept-Encoding header value."""
+    out = {}
+    for part in (value or "").split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        out[token.lower()] = max(q, out.get(token.lower(), 0.0))
+    return out
+
+def wants_msgpack(accept_header: str) -> bool:
+    if msgpack is None:
+        return False
+    accept = parse_accept(accept_header)
+    q = max(accept.get(t, 0.0) for t in MSGPACK_TYPES)
+    return q > 0 and q >= accept.get("application/json", 0.0)
+
+def negotiated(request, content, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """content (plain dicts/lists/str/numbers) as MessagePack or JSON, per the request's Accept header."""
+    headers = dict(headers or {}, Vary="Accept")
+    if wants_msgpack(request.headers.get("accept", "")):
+        return Response(msgpack.packb(content, use_bin_type=True), status_code=status_code,
+                        media_type="application/msgpack", headers=headers)
+    return JSONResponse(content, status_code=status_code, headers=headers)
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accept = parse_accept(accept_encoding)
+    best, best_q = None, 0.0
+    for enc in (("br", "gzip") if brotli is not None else ("gzip",)):
+        q = accept.get(enc, accept.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+def compress(encoding: str, body: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class CompressionMiddleware:
+    """ASGI middleware: br/gzip for single-message responses; streamed ones are left alone."""
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                return await send(message)
+            begin, start = start, None
+            headers = MutableHeaders(scope=begin)
+            body = message.get("body", b"")
+            if message.get("more_body") or "content-encoding" in headers or len(body) < self.minimum_size:
+                await send(begin)
+                return await send(message)
+            body = compress(encoding, body)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(begin)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+filelock.py - advisory cross-process lock on a directory's .lock file
+SearchIndex, VectorIndex and EmbeddingStore hold it while they append to or rewrite
+their files, so several API workers can share one directory. Uses fcntl.flock where
+available; elsewhere only the callers' in-process locks apply.
+"""
+import os
+
+def flock(f):
+    try:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    except ImportError:
+        pass
+
+def dir_lock(root: str):
+    """<root>/.lock, open and exclusively locked; closing it (the end of a with block) releases the lock."""
+    f = open(os.path.join(root, ".lock"), "a")
+    try:
+        flock(f)
+    except BaseException:
+        f.close()
+        raise
+    return f
@@ -1,12 +1,34 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from typing import Optional, List
 import os
 import re
-
-from PyPDF2 import PdfReader
+import json
+import hashlib
+import heapq
+import time
+from collections import Counter
+import asyncio
+import tempfile
+import uuid
+
+from .caching import TextCache, PageCache, AnalysisCache, LRUCache, sha256_file
+from .pdf_text import extract_text
+from .pdf_sandbox import ExtractionError
+from .encoding import CompressionMiddleware, negotiated, available as available_encodings
+from .blob_store import BlobStore
+from .workers import AnalysisPool, PoolSaturated
+from .scoring_matrix import score_matrix
+from .search_index import SearchIndex
+from .vector_index import VectorIndex, SpaceMismatch
+from . import semantic
+from . import metrics
+from . import taxonomy
+from .analytics import text_stats
+from . import db_store
 
 app = FastAPI(title="Resume Analyzer Backend")
 
@@ -17,10 +39,157 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# === br/gzip per Accept-Encoding (inside the timing middleware, so it sees the real response) ===
+app.add_middleware(CompressionMiddleware)
+
+
+# === Per-stage timings (Prometheus /metrics + Server-Timing header); METRICS_ENABLED=0 turns both off ===
+if metrics.ENABLED:
+    @app.middleware("http")
+    async def server_timing(request: Request, call_next):
+        timings, token = metrics.collect()
+        t0 = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        response.headers["Server-Timing"] = metrics.finish(
+            timings, token, getattr(route, "path", None), time.perf_counter() - t0
+        )
+        return response
+
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", 256 * 1024))
+# uploads up to this size are hashed in memory; a duplicate of stored content then costs no disk writes
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", 2 * 1024 * 1024))
+# room for multipart boundaries, part headers and the job_description field on top of the file itself
+UPLOAD_FORM_OVERHEAD = int(os.getenv("UPLOAD_FORM_OVERHEAD", 64 * 1024))
+
+
+class UploadLimitMiddleware:
+    """
+    Caps the request body of POST /upload while it is received: a Content-Length over
+    the limit is refused before any of the body is read, and a chunked body is cut off
+    at the first message that crosses it. Starlette parses the whole multipart form
+    before the handler runs, so the handler's own check alone would come too late.
+    """
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(status_code=413, content={"detail": f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit."})
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != "/upload":
+            return await self.app(scope, receive, send)
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(scope, receive, send)
+        received = 0
+        exceeded = False
+        started = False
+
+        async def capped_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    return {"type": "http.disconnect"}  # stops the form parser; its error response is dropped
+            return message
+
+        async def capped_send(message):
+            nonlocal started
+            if exceeded:
+                return
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, capped_receive, capped_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not started:
+            await self._reject(scope, receive, send)
+
+
+app.add_middleware(UploadLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD)
+
+# === Content-addressed PDF storage (one file per distinct content; pdf_id -> sha in db_store) ===
+blob_store = BlobStore(os.getenv("BLOB_DIR", os.path.join(UPLOAD_DIR, "blobs")))
+
+# === Extracted-text cache (keyed by SHA-256 of the PDF bytes) ===
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+text_cache = TextCache(
+    os.path.join(CACHE_DIR, "text"),
+    max_memory_bytes=int(os.getenv("TEXT_CACHE_MEMORY_BYTES", 64 * 1024 * 1024)),
+    max_disk_bytes=int(os.getenv("TEXT_CACHE_DISK_BYTES", 1024 * 1024 * 1024)),
+)
+
+# === Per-page text, so budgeted/partial extractions can be resumed page by page (shared with workers) ===
+page_cache = PageCache(
+    os.path.join(CACHE_DIR, "pages"),
+    max_memory_bytes=int(os.getenv("PAGE_CACHE_MEMORY_BYTES", 16 * 1024 * 1024)),
+    max_disk_bytes=int(os.getenv("PAGE_CACHE_DISK_BYTES", 512 * 1024 * 1024)),
+)
+# extraction budgets (0 = whole document); a request may lower max_pages further
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", 0))
+EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", 0))
+PREVIEW_CHARS = 2000
+
+# === Memoized analysis results (hot in-process tier over db_store) ===
+analysis_cache = AnalysisCache(
+    max_memory_bytes=int(os.getenv("ANALYSIS_CACHE_MEMORY_BYTES", 32 * 1024 * 1024)),
+    store=db_store,
+)
+
+# === BM25 index over every uploaded resume (for /search) ===
+search_index = SearchIndex(
+    os.getenv("SEARCH_INDEX_DIR", os.path.join(CACHE_DIR, "search")),
+    compact_threshold=int(os.getenv("SEARCH_COMPACT_THRESHOLD", 2000)),
+)
+
+# === ANN index over resume embeddings (hashed lexical vectors without a model) ===
+vector_index = VectorIndex(
+    os.getenv("VECTOR_INDEX_DIR", os.path.join(CACHE_DIR, "vectors")),
+    n_probe=int(os.getenv("VECTOR_NPROBE", 8)),
+)
+
+# === Compiled job profiles, by job_id (source JD persisted in db_store) ===
+job_profiles = LRUCache(
+    max_bytes=int(os.getenv("JOB_PROFILE_CACHE_BYTES", 16 * 1024 * 1024)),
+    sizeof=lambda p: len(p["job_description"]) + 64 * len(p["tokens"]),
+)
+
+# === Process pool for PDF parsing & scoring (keeps the event loop free) ===
+analysis_pool = AnalysisPool(
+    max_workers=int(os.getenv("ANALYZE_WORKERS", os.cpu_count() or 1)),
+    max_queue=int(os.getenv("ANALYZE_QUEUE_SIZE", 32)),
+)
+RETRY_AFTER_SECONDS = os.getenv("ANALYZE_RETRY_AFTER", "5")
+
+# === Bulk runs (/bulk): durable queue in db_store, dispatched onto analysis_pool ===
+# every API process runs a dispatcher; items are leased, so several processes share one queue
+# and a run interrupted by a restart continues once the dead process's leases expire
+BULK_DISPATCH = os.getenv("BULK_DISPATCH", "1").lower() in ("1", "true", "yes")
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", max(1, analysis_pool.max_workers // 2)))
+BULK_LEASE_SECONDS = float(os.getenv("BULK_LEASE_SECONDS", 60))
+BULK_MAX_ATTEMPTS = int(os.getenv("BULK_MAX_ATTEMPTS", 3))
+BULK_POLL_SECONDS = float(os.getenv("BULK_POLL_SECONDS", 0.5))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 10000))
+BULK_OWNER = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+bulk_dispatcher_task: Optional[asyncio.Task] = None
+bulk_wakeup: Optional[asyncio.Event] = None
+
+# opt-in: load the embedding model at startup instead of inside the first request
+SEMANTIC_WARMUP = os.getenv("SEMANTIC_WARMUP", "0").lower() in ("1", "true", "yes")
 
 # --- simple stopword list for tokenization ---
 STOPWORDS = {
@@ -32,25 +201,20 @@ STOPWORDS = {
     "using", "use", "used"
 }
 
-# Basic dictionaries of skills – tweak for your tech stack
-TECH_SKILLS = [
-    "python", "java", "c++", "c", "javascript", "typescript",
-    "react", "redux", "next.js",
-    "node.js", "express", "fastapi", "django", "flask",
-    "html", "css", "tailwind", "bootstrap",
-    "mongodb", "mysql", "postgresql", "sql",
-    "rest api", "restful api", "graphql",
-    "git", "github", "docker",
-    "aws", "azure", "gcp",
-    "machine learning", "deep learning", "pandas", "numpy", "opencv",
-]
-
-SOFT_SKILLS = [
-    "communication", "teamwork", "team collaboration", "leadership",
-    "problem solving", "analytical", "time management",
-    "adaptability", "self-motivated", "presentation skills",
-    "stakeholder management", "critical thinking", "ownership",
-]
+# Skills, aliases, categories and weights live in skills_taxonomy.json (see taxonomy.py);
+# its version id is part of every memo key and job profile, so edits take effect on their own.
+
+# bump ANALYSIS_VERSION whenever scoring/suggestion logic changes, so memoized results are not reused
+ANALYSIS_VERSION = "2"
+
+# what ?fields= may select from an analysis; the optional ones cost a stage (or bandwidth) and are
+# skipped when not asked for
+ANALYSIS_FIELDS = (
+    "ats_score", "missing_skills_job", "suggestions", "skills_found", "soft_skills_found",
+    "raw_text_preview", "text_stats", "taxonomy_version",
+)
+OPTIONAL_ANALYSIS_FIELDS = ("suggestions", "raw_text_preview", "text_stats")
+BATCH_FIELDS = ("ats_score", "similarity", "missing_skills_job", "skills_found", "soft_skills_found")
 
 
 # ---------------- Root & Health ---------------- #
@@ -68,20 +232,187 @@ def health():
     return {"status": "ok", "message": "backend healthy"}
 
 
+@app.get("/ready", tags=["health"])
+def ready():
+    model = semantic.model_status()
+    is_ready = model["loaded"] or model["sidecar"] is not None or not SEMANTIC_WARMUP or not model["available"] or model["error"] is not None
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "warming_up", "semantic_model": model},
+    )
+
+
+@app.get("/stats", tags=["health"])
+def stats():
+    return {
+        "taxonomy": {"version": taxonomy.current().version, "skills": len(taxonomy.current().skills)},
+        "uploads": db_store.blob_stats(),
+        "text_cache": text_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "analysis_pool": analysis_pool.stats(),
+        "search_index": search_index.stats(),
+        "vector_index": vector_index.stats(),
+        "encodings": available_encodings(),
+    }
+
+
+@app.get("/metrics", tags=["health"])
+def prometheus_metrics():
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0).")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("startup")
+async def warm_up_semantic_model():
+    if SEMANTIC_WARMUP:
+        # in the background so /health answers while the model loads; /ready tracks it
+        asyncio.get_running_loop().run_in_executor(None, semantic.warm_up)
+
+
+@app.on_event("startup")
+async def report_encodings():
+    missing = [name for name, ok in available_encodings().items() if not ok]
+    if missing:
+        print(f"encoding: {', '.join(missing)} not installed; those response encodings are disabled")
+
+
+@app.on_event("startup")
+async def start_bulk_dispatcher():
+    global bulk_dispatcher_task, bulk_wakeup
+    bulk_wakeup = asyncio.Event()
+    if BULK_DISPATCH:
+        bulk_dispatcher_task = asyncio.create_task(bulk_dispatcher())
+
+
+@app.on_event("shutdown")
+async def shutdown_pool():
+    if bulk_dispatcher_task is not None:
+        bulk_dispatcher_task.cancel()
+        try:
+            await bulk_dispatcher_task
+        except asyncio.CancelledError:
+            pass
+    analysis_pool.shutdown()
+
+
 # ---------------- Helpers ---------------- #
 
-def extract_text_from_pdf(path: str) -> str:
-    """Read all text from a PDF using PyPDF2."""
+def extract_pages(
+    path: str, sha: Optional[str] = None, max_pages: int = EXTRACT_MAX_PAGES, max_chars: int = EXTRACT_MAX_CHARS
+) -> tuple:
+    """
+    Page-wise text extraction under a page/character budget, reusing pages from
+    page_cache when the PDF's sha is known. Returns (text, complete); raises
+    ExtractionError for PDFs the sandbox could not read.
+    """
+    text, complete, _ = extract_text(path, sha, page_cache, max_pages=max_pages, max_chars=max_chars)
+    return text, complete
+
+
+def extract_text_from_pdf(path: str, sha: Optional[str] = None) -> str:
+    """Read all text from a PDF using PyPDF2 (within the configured extraction budget)."""
+    return extract_pages(path, sha)[0]
+
+
+def budget_active(max_pages: int = 0) -> bool:
+    """Whether extraction is capped; capped results must not go into (or come from) the full-text cache."""
+    return bool(max_pages or EXTRACT_MAX_PAGES or EXTRACT_MAX_CHARS)
+
+
+def full_text_cached(sha: str, max_pages: int = 0) -> Optional[str]:
+    return None if budget_active(max_pages) else text_cache.get(sha)
+
+
+def cache_texts(pairs: List[tuple]):
+    """Store freshly extracted (sha, text) pairs in the text cache."""
+    for sha, text in pairs:
+        text_cache.put(sha, text)
+
+
+def effective_max_pages(max_pages: Optional[int]) -> int:
+    if max_pages and EXTRACT_MAX_PAGES:
+        return min(max_pages, EXTRACT_MAX_PAGES)
+    return max_pages or EXTRACT_MAX_PAGES
+
+
+def pdf_sha256(pdf_path: str) -> str:
+    """SHA-256 of a legacy upload (uploads/<filename>), recorded next to it after the first hash."""
+    sidecar = pdf_path + ".sha256"
     try:
-        reader = PdfReader(path)
-        texts: List[str] = []
-        for page in reader.pages:
-            t = page.extract_text() or ""
-            texts.append(t)
-        return "\n".join(texts)
-    except Exception as e:
-        print(f"PDF parse error: {e}")
-        return ""
+        with open(sidecar, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        pass
+    sha = sha256_file(pdf_path)
+    with open(sidecar, "w", encoding="utf-8") as f:
+        f.write(sha)
+    return sha
+
+
+def resolve_upload(pdf_id: str) -> Optional[tuple]:
+    """
+    (pdf_path, sha) for a pdf_id: the blob recorded in db_store, or a legacy file saved
+    under its filename before content-addressed storage. None if unknown.
+    """
+    row = db_store.get_upload(pdf_id)
+    if row is not None:
+        return blob_store.path(row["sha"]), row["sha"]
+    if not pdf_id or os.path.basename(pdf_id) != pdf_id:
+        return None
+    pdf_path = os.path.join(UPLOAD_DIR, pdf_id)
+    if not os.path.isfile(pdf_path):
+        return None
+    return pdf_path, pdf_sha256(pdf_path)
+
+
+def extraction_failed(e: ExtractionError) -> HTTPException:
+    return HTTPException(status_code=422, detail=e.to_dict())
+
+
+def pool_busy() -> HTTPException:
+    """503 with Retry-After for a PoolSaturated analysis pool."""
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy analyzing other resumes. Please retry shortly.",
+        headers={"Retry-After": RETRY_AFTER_SECONDS},
+    )
+
+
+def parse_fields(value, allowed: tuple = ANALYSIS_FIELDS) -> Optional[frozenset]:
+    """?fields=a,b (or a list) -> frozenset; None when not given, meaning every field."""
+    if value is None:
+        return None
+    names = value.split(",") if isinstance(value, str) else value
+    fields = frozenset(n.strip() for n in names if n.strip())
+    unknown = sorted(fields - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(allowed)}.")
+    return fields or None
+
+
+def project(result: dict, fields: Optional[frozenset], allowed: tuple = ANALYSIS_FIELDS) -> dict:
+    """A new dict with only the requested fields (cached results are never modified)."""
+    if fields is None:
+        return result
+    return {k: result[k] for k in allowed if k in fields and k in result}
+
+
+def require_upload(pdf_id: str) -> tuple:
+    found = resolve_upload(pdf_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Uploaded file not found on server.")
+    return found
+
+
+def normalize_jd(job_desc: str) -> str:
+    """Lowercased, whitespace-collapsed JD; matching is case-insensitive so results are unchanged."""
+    return " ".join((job_desc or "").lower().split())
+
+
+def jd_sha256(job_desc: str) -> str:
+    return hashlib.sha256(normalize_jd(job_desc).encode("utf-8")).hexdigest()
 
 
 def tokenize(text: str) -> List[str]:
@@ -100,26 +431,16 @@ def jaccard_similarity(words1: List[str], words2: List[str]) -> float:
     return inter / union if union else 0.0
 
 
-def find_skills(text: str, candidates: List[str]) -> List[str]:
-    """Return list of skills from `candidates` that appear in `text`."""
-    tlow = text.lower()
-    found = []
-    for s in candidates:
-        if s.lower() in tlow:
-            found.append(s)
-    return sorted(set(found))
+def find_skills(text: str, kind: Optional[str] = None) -> List[str]:
+    """Skills of the taxonomy ("tech", "soft" or both) that appear in `text`, by canonical name."""
+    return taxonomy.current().find(text, kind)
 
 
 def get_job_skill_targets(job_desc: str) -> List[str]:
-    """Skills that the JD is asking for (based on our dictionaries)."""
+    """Skills that the JD is asking for (based on the skill taxonomy)."""
     if not job_desc:
         return []
-    jlow = job_desc.lower()
-    targets = []
-    for s in TECH_SKILLS + SOFT_SKILLS:
-        if s.lower() in jlow:
-            targets.append(s)
-    return sorted(set(targets))
+    return taxonomy.current().find(job_desc)
 
 
 def compute_ats_score(
@@ -172,7 +493,7 @@ def compute_ats_score(
 
 def group_missing_skills(missing: List[str]) -> dict:
     """
-    Group missing skills into rough categories to craft better suggestions.
+    Group missing skills by their taxonomy category to craft better suggestions.
     """
     groups = {
         "backend": [],
@@ -181,18 +502,9 @@ def group_missing_skills(missing: List[str]) -> dict:
         "cloud": [],
         "general": [],
     }
+    tax = taxonomy.current()
     for s in missing:
-        sl = s.lower()
-        if any(k in sl for k in ["node", "django", "fastapi", "flask", "api"]):
-            groups["backend"].append(s)
-        elif any(k in sl for k in ["react", "css", "html", "bootstrap", "tailwind", "frontend", "ui"]):
-            groups["frontend"].append(s)
-        elif any(k in sl for k in ["machine learning", "deep learning", "pandas", "numpy", "data"]):
-            groups["data"].append(s)
-        elif any(k in sl for k in ["aws", "azure", "gcp", "cloud", "docker"]):
-            groups["cloud"].append(s)
-        else:
-            groups["general"].append(s)
+        groups.get(tax.category(s), groups["general"]).append(s)
     return groups
 
 
@@ -301,29 +613,219 @@ def build_suggestions(
     return suggestions
 
 
+def build_job_profile(job_desc: str) -> dict:
+    """
+    Everything derived from the JD alone, computed once per JD: tokens, skill
+    targets with their taxonomy weights and a term-frequency vector.
+    """
+    tax = taxonomy.current()
+    tokens = tokenize(job_desc) if job_desc else []
+    targets = tax.find(job_desc) if job_desc else []
+    counts = Counter(tokens)
+    total = max(1, len(tokens))
+    return {
+        "job_description": job_desc,
+        "jd_sha": jd_sha256(job_desc),
+        "dictionary_version": tax.version,
+        "tokens": tokens,
+        "targets": targets,
+        "weights": {s: tax.weight(s) for s in targets},
+        "term_vector": {t: round(c / total, 6) for t, c in counts.items()},
+    }
+
+
+def resume_features(resume_text: str) -> dict:
+    """JD-independent features of a resume, the per-row input of scoring_matrix.score_matrix."""
+    tech_found, soft_found = taxonomy.current().find_by_kind(resume_text)
+    return {
+        "token_set": set(tokenize(resume_text)),
+        "tech_found": tech_found,
+        "soft_found": soft_found,
+        "skills": tech_found + soft_found,
+        "length": len(resume_text),
+    }
+
+
+def score_resume(resume_text: str, profile: dict) -> dict:
+    """Skills, missing skills, similarity and ATS score of one resume against a JD profile."""
+    # 2. Tokenize
+    with metrics.stage("tokenize"):
+        resume_tokens = tokenize(resume_text)
+    jd_tokens = profile["tokens"]
+
+    # 3. Detect skills in resume
+    with metrics.stage("skills"):
+        tech_found, soft_found = taxonomy.current().find_by_kind(resume_text)
+
+    # 4. Determine which skills JD is asking for & missing skills
+    job_targets = profile["targets"]
+    missing_skills_job = [
+        s for s in job_targets if s not in tech_found and s not in soft_found
+    ]
+
+    # 5. Similarity & ATS score
+    with metrics.stage("score"):
+        similarity = jaccard_similarity(resume_tokens, jd_tokens)
+        ats_score = compute_ats_score(
+            job_targets=job_targets,
+            missing_skills=missing_skills_job,
+            resume_tokens=resume_tokens,
+            jd_tokens=jd_tokens,
+            resume_skills_count=len(tech_found) + len(soft_found),
+            resume_length=len(resume_text),
+        )
+    return {
+        "ats_score": ats_score,
+        "similarity": similarity,
+        "missing_skills_job": missing_skills_job,
+        "skills_found": tech_found,
+        "soft_skills_found": soft_found,
+    }
+
+
+def run_analysis(
+    pdf_path: str, cached_text: Optional[str], job_desc: str, profile: Optional[dict] = None,
+    sha: Optional[str] = None, max_pages: int = EXTRACT_MAX_PAGES, skip: tuple = (),
+) -> tuple:
+    """
+    Full single-resume analysis; runs inside an analysis_pool worker. Pass a
+    precompiled `profile` (registered job) to skip re-deriving it from `job_desc`.
+    Extraction stops after max_pages pages (0 = all). Optional fields named in
+    `skip` (see OPTIONAL_ANALYSIS_FIELDS) are neither computed nor returned.
+    Returns (extracted, analysis): extracted is the freshly extracted text when it
+    covers the whole document (else None); analysis is None if there was no text.
+    """
+    # 1. Extract text from resume
+    extracted = None
+    if cached_text is not None:
+        resume_text = cached_text
+    else:
+        with metrics.stage("extract"):
+            resume_text, complete = extract_pages(pdf_path, sha, max_pages=max_pages)
+        extracted = resume_text if complete else None
+    if not resume_text.strip():
+        return extracted, None
+
+    if profile is None or profile["dictionary_version"] != taxonomy.current().version:
+        with metrics.stage("job_profile"):
+            profile = build_job_profile(job_desc)
+
+    # 2.-5. Tokenize, detect skills, compare with JD, score
+    scored = score_resume(resume_text, profile)
+
+    analysis = {
+        "ats_score": scored["ats_score"],
+        "missing_skills_job": scored["missing_skills_job"],
+        "skills_found": scored["skills_found"],
+        "soft_skills_found": scored["soft_skills_found"],
+        "taxonomy_version": profile["dictionary_version"],
+    }
+
+    # 6. Suggestions
+    if "suggestions" not in skip:
+        with metrics.stage("suggestions"):
+            analysis["suggestions"] = build_suggestions(
+                job_desc=job_desc,
+                job_targets=profile["targets"],
+                missing_skills=scored["missing_skills_job"],
+                tech_found=scored["skills_found"],
+                soft_found=scored["soft_skills_found"],
+                resume_length=len(resume_text),
+                similarity=scored["similarity"],
+            )
+
+    # 7. Readability, bullets and quantified achievements (one scan)
+    if "text_stats" not in skip:
+        with metrics.stage("text_stats"):
+            analysis["text_stats"] = text_stats(resume_text)
+
+    if "raw_text_preview" not in skip:
+        analysis["raw_text_preview"] = resume_text[:PREVIEW_CHARS]
+
+    return extracted, {k: analysis[k] for k in ANALYSIS_FIELDS if k in analysis}
+
+
 # ---------------- Upload Endpoint ---------------- #
 
+class UploadTooLarge(Exception):
+    pass
+
+
+async def stream_upload(file: UploadFile) -> tuple:
+    """
+    Read the upload in UPLOAD_CHUNK_BYTES pieces, hashing as it streams. Small files
+    stay in memory; past UPLOAD_SPOOL_BYTES they spill to a temp file under the blob
+    root (same filesystem, so it can be renamed into place). Returns
+    (tmp_path or None, data or None, size, sha256). Raises UploadTooLarge past
+    MAX_UPLOAD_BYTES; grossly oversized requests never get here, UploadLimitMiddleware
+    cuts them off while they are received.
+    """
+    h = hashlib.sha256()
+    size = 0
+    chunks, out, tmp_path = [], None, None
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge()
+            h.update(chunk)
+            if out is None and size > UPLOAD_SPOOL_BYTES:
+                fd, tmp_path = tempfile.mkstemp(dir=blob_store.root, suffix=".part")
+                out = os.fdopen(fd, "wb")
+                await run_in_threadpool(out.write, b"".join(chunks))
+                chunks = []
+            if out is not None:
+                await run_in_threadpool(out.write, chunk)
+            else:
+                chunks.append(chunk)
+    except BaseException:
+        if out is not None:
+            out.close()
+            os.remove(tmp_path)
+        raise
+    if out is not None:
+        out.close()
+        return tmp_path, None, size, h.hexdigest()
+    return None, b"".join(chunks), size, h.hexdigest()
+
+
 @app.post("/upload", tags=["upload"])
 async def upload_resume(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     job_description: Optional[str] = Form(None),
 ):
     """
     Upload a resume PDF, save it, and return a pdf_id that the frontend
-    can use later when calling /analyze.
+    can use later when calling /analyze. Every upload gets its own opaque
+    pdf_id; identical content is stored once and shared.
     """
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit.")
+
     try:
-        content = await file.read()
-        size = len(content)
+        with metrics.stage("upload"):
+            tmp_path, data, size, sha = await stream_upload(file)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_UPLOAD_BYTES} byte upload limit.")
 
-        save_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(save_path, "wb") as f:
-            f.write(content)
+    try:
+        pdf_id = uuid.uuid4().hex
+        with metrics.stage("store"):
+            is_new = await run_in_threadpool(
+                db_store.add_upload, pdf_id, sha, file.filename, size,
+                lambda: blob_store.place(sha, tmp_path, data),
+            )
+        save_path = blob_store.path(sha)
 
-        pdf_id = file.filename
+        # extract + add to the search index after the response is sent
+        background_tasks.add_task(index_upload, pdf_id, save_path, sha)
 
         return JSONResponse(
             status_code=200,
@@ -333,93 +835,776 @@ async def upload_resume(
                 "filename": file.filename,
                 "stored_path": save_path,
                 "size_bytes": size,
+                "sha256": sha,
+                "deduplicated": not is_new,
                 "job_description": job_description or "",
             },
         )
     except Exception as e:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
         return JSONResponse(
             status_code=500,
             content={"status": "error", "detail": str(e)},
         )
 
 
+@app.delete("/upload/{pdf_id}", tags=["upload"])
+def delete_upload(pdf_id: str):
+    """Forget an upload; its file is removed once no other pdf_id shares the content."""
+    sha = db_store.delete_upload(pdf_id, blob_store.remove)
+    if sha is None:
+        found = resolve_upload(pdf_id)
+        if found is None:
+            raise HTTPException(status_code=404, detail="Uploaded file not found on server.")
+        for path in (found[0], found[0] + ".sha256"):  # legacy uploads/<filename>
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    search_index.delete(pdf_id)
+    vector_index.delete(pdf_id)
+    return {"status": "ok", "pdf_id": pdf_id}
+
+
+@app.get("/preview/{pdf_id}", tags=["upload"])
+async def preview_resume(pdf_id: str, chars: int = PREVIEW_CHARS):
+    """First `chars` characters of an upload; only the pages needed for them are extracted."""
+    if chars < 1:
+        raise HTTPException(status_code=400, detail="chars must be at least 1.")
+    pdf_path, sha = require_upload(pdf_id)
+    cached_text = full_text_cached(sha)
+    if cached_text is not None:
+        return {"pdf_id": pdf_id, "preview": cached_text[:chars], "complete": len(cached_text) <= chars}
+    try:
+        budget = min(chars, EXTRACT_MAX_CHARS) if EXTRACT_MAX_CHARS else chars
+        text, complete = await analysis_pool.run(extract_pages, pdf_path, sha, EXTRACT_MAX_PAGES, budget)
+    except ExtractionError as e:
+        raise extraction_failed(e)
+    except PoolSaturated:
+        raise pool_busy()
+    return {"pdf_id": pdf_id, "preview": text, "complete": complete}
+
+
+# ---------------- Resume Search ---------------- #
+
+def term_frequencies(pdf_path: str, cached_text: Optional[str], sha: Optional[str] = None) -> tuple:
+    """Worker-side: (freshly extracted text or None, {token: count}) for indexing."""
+    if cached_text is not None:
+        return None, dict(Counter(tokenize(cached_text)))
+    try:
+        resume_text, complete = extract_pages(pdf_path, sha)
+    except ExtractionError as e:
+        print(f"search index: skipping {pdf_path}: {e}")
+        return None, {}
+    return (resume_text if complete else None), dict(Counter(tokenize(resume_text)))
+
+
+def index_terms_chunk(items: List[tuple]) -> List[tuple]:
+    return [(pdf_id, sha) + term_frequencies(pdf_path, cached_text, sha)
+            for pdf_id, pdf_path, sha, cached_text in items]
+
+
+def add_resume_vectors(pdf_ids: List[str], texts: List[str]):
+    """Embed texts in one batch and add them to vector_index (restarting it if the vector space changed)."""
+    if not pdf_ids:
+        return
+    space, vectors = semantic.document_vectors(texts, persist=False)  # the vector index keeps them
+    for pdf_id, vec in zip(pdf_ids, vectors):
+        try:
+            vector_index.add(pdf_id, vec, space)
+        except SpaceMismatch as e:  # checked against the index on disk, which another process may have reset
+            print(f"vector index: {e}, rebuilding")
+            vector_index.reset()
+            vector_index.add(pdf_id, vec, space)
+
+
+def store_index_results(results: List[tuple], cached: dict, compact: bool = False) -> int:
+    """
+    Parent-side half of indexing, run in the thread pool (cache/index writes and a
+    possible segment compaction touch disk). results are (pdf_id, sha, extracted, tf);
+    cached maps pdf_id -> the cached text sent to the worker. Returns how many were indexed.
+    """
+    indexed = 0
+    vec_ids, vec_texts = [], []
+    for pdf_id, sha, extracted, tf in results:
+        if extracted and extracted.strip():
+            text_cache.put(sha, extracted)
+        if not tf:
+            continue
+        search_index.add(pdf_id, tf)
+        indexed += 1
+        if not vector_index.contains(pdf_id):
+            vec_ids.append(pdf_id)
+            vec_texts.append(extracted if extracted is not None else cached[pdf_id])
+    if compact:
+        search_index.compact()
+    add_resume_vectors(vec_ids, vec_texts)
+    return indexed
+
+
+async def index_upload(pdf_id: str, pdf_path: str, sha: str):
+    cached_text = await run_in_threadpool(full_text_cached, sha)
+    try:
+        extracted, tf = await analysis_pool.run(term_frequencies, pdf_path, cached_text, sha)
+    except PoolSaturated:
+        print(f"search index: pool busy, {pdf_id} left for /search/reindex")
+        return
+    await run_in_threadpool(store_index_results, [(pdf_id, sha, extracted, tf)], {pdf_id: cached_text})
+
+
+class SearchRequest(BaseModel):
+    job_description: Optional[str] = None
+    job_id: Optional[str] = None
+    top_k: int = 10
+
+
+@app.post("/search", tags=["search"])
+def search_resumes(req: SearchRequest):
+    """BM25-ranked pdf_ids of stored resumes that best fit a JD (text or registered job_id)."""
+    if req.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1.")
+    if req.job_id:
+        tokens = require_job_profile(req.job_id)["tokens"]
+    else:
+        tokens = tokenize(normalize_jd(req.job_description))
+    if not tokens:
+        raise HTTPException(status_code=400, detail="job_description or job_id is required.")
+    t0 = time.perf_counter()
+    hits = search_index.search(tokens, req.top_k)
+    return {
+        "results": [{"pdf_id": pdf_id, "score": score} for pdf_id, score in hits],
+        "took_ms": round((time.perf_counter() - t0) * 1000, 3),
+    }
+
+
+def unindexed_uploads() -> List[tuple]:
+    """(pdf_id, pdf_path, sha, cached text or None) for every upload missing from either index."""
+    uploads = [(u["pdf_id"], blob_store.path(u["sha"]), u["sha"]) for u in db_store.list_uploads()]
+    for name in sorted(os.listdir(UPLOAD_DIR)):  # legacy uploads/<filename>
+        pdf_path = os.path.join(UPLOAD_DIR, name)
+        if name.lower().endswith(".pdf") and os.path.isfile(pdf_path):
+            uploads.append((name, pdf_path, None))
+    items = []
+    for pdf_id, pdf_path, sha in uploads:
+        if search_index.contains(pdf_id) and vector_index.contains(pdf_id):
+            continue
+        sha = sha or pdf_sha256(pdf_path)
+        items.append((pdf_id, pdf_path, sha, full_text_cached(sha)))
+    return items
+
+
+@app.post("/search/reindex", tags=["search"])
+async def reindex_uploads():
+    """Index every stored upload that is not in the search index yet (e.g. files from before it existed)."""
+    items = await run_in_threadpool(unindexed_uploads)
+    if not items:
+        return {"indexed": 0, "documents": search_index.stats()["documents"]}
+
+    n_chunks = max(1, min(len(items), analysis_pool.max_workers))
+    try:
+        chunk_results = await analysis_pool.run_many(
+            index_terms_chunk, [(items[k::n_chunks],) for k in range(n_chunks)]
+        )
+    except PoolSaturated:
+        raise pool_busy()
+    results = [r for chunk in chunk_results for r in chunk]
+    indexed = await run_in_threadpool(store_index_results, results, {it[0]: it[3] for it in items}, True)
+    return {"indexed": indexed, "documents": search_index.stats()["documents"]}
+
+
+class SemanticSearchRequest(BaseModel):
+    job_description: Optional[str] = None
+    job_id: Optional[str] = None
+    top_k: int = 10
+    n_probe: Optional[int] = Field(None, ge=1)  # more lists = better recall, slower
+    exact: bool = False             # brute force over every vector
+    check_recall: bool = False      # also report recall of the approximate result vs brute force
+
+
+@app.post("/search/semantic", tags=["search"])
+async def semantic_search_resumes(req: SemanticSearchRequest):
+    """Nearest stored resumes to a JD by embedding (ANN over vector_index)."""
+    if req.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1.")
+    job_desc = require_job_profile(req.job_id)["job_description"] if req.job_id else normalize_jd(req.job_description)
+    if not job_desc:
+        raise HTTPException(status_code=400, detail="job_description or job_id is required.")
+    space, query = await run_in_threadpool(semantic.document_vectors, [job_desc])
+    t0 = time.perf_counter()
+    try:
+        hits = vector_index.search(query[0], req.top_k, n_probe=req.n_probe, exact=req.exact, space=space)
+        out = {
+            "space": space,
+            "results": [{"pdf_id": pdf_id, "score": score} for pdf_id, score in hits],
+            "took_ms": round((time.perf_counter() - t0) * 1000, 3),
+        }
+        if req.check_recall and not req.exact:
+            out["recall"] = vector_index.recall(query, req.top_k, n_probe=req.n_probe, space=space)
+    except SpaceMismatch:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Vector index holds {vector_index.space} vectors but queries are {space}. Run /search/reindex.",
+        )
+    return out
+
+
+@app.delete("/search/{pdf_id}", tags=["search"])
+def remove_from_search(pdf_id: str):
+    removed_text = search_index.delete(pdf_id)
+    removed_vector = vector_index.delete(pdf_id)
+    if not (removed_text or removed_vector):
+        raise HTTPException(status_code=404, detail="pdf_id is not in the search index.")
+    return {"status": "ok", "pdf_id": pdf_id}
+
+
+# ---------------- Job Profiles ---------------- #
+
+class JobCreateRequest(BaseModel):
+    job_description: str
+    title: Optional[str] = None
+
+
+def _job_summary(job_id: str, title: Optional[str], profile: dict) -> dict:
+    return {
+        "job_id": job_id,
+        "title": title or "",
+        "targets": profile["targets"],
+        "weights": profile["weights"],
+        "token_count": len(profile["tokens"]),
+        "dictionary_version": profile["dictionary_version"],
+    }
+
+
+def get_job_profile(job_id: str) -> Optional[dict]:
+    """Compiled profile for a registered job; recompiled from the stored JD if evicted or stale."""
+    profile = job_profiles.get(job_id)
+    if profile is not None and profile["dictionary_version"] == taxonomy.current().version:
+        return profile
+    row = db_store.get_job(job_id)
+    if row is None:
+        return None
+    profile = build_job_profile(row["job_description"])
+    profile["job_id"] = job_id
+    profile["title"] = row["title"]
+    job_profiles.put(job_id, profile)
+    return profile
+
+
+def require_job_profile(job_id: str) -> dict:
+    profile = get_job_profile(job_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown job_id. Register the job via POST /jobs.")
+    return profile
+
+
+def register_job(job_description: str, title: Optional[str] = None, keep_title: bool = False) -> dict:
+    """
+    Compile and store a JD under its content-derived job_id. keep_title=True leaves
+    an already registered job (and its title) as it is.
+    """
+    job_desc = normalize_jd(job_description)
+    if not job_desc:
+        raise HTTPException(status_code=400, detail="job_description must not be empty.")
+    profile = build_job_profile(job_desc)
+    job_id = profile["jd_sha"][:16]
+    existing = db_store.get_job(job_id) if keep_title else None
+    if existing is None:
+        db_store.save_job(job_id, title or "", job_desc)
+    profile["job_id"] = job_id
+    profile["title"] = existing["title"] if existing else title or ""
+    job_profiles.put(job_id, profile)
+    return profile
+
+
+@app.post("/jobs", tags=["jobs"])
+def create_job(req: JobCreateRequest):
+    """
+    Register a job description once and get back a job_id that /analyze and
+    /analyze/batch accept instead of the raw text. Same JD -> same job_id.
+    """
+    profile = register_job(req.job_description, req.title)
+    return _job_summary(profile["job_id"], req.title, profile)
+
+
+@app.get("/jobs", tags=["jobs"])
+def list_jobs(limit: int = 100):
+    return {"jobs": db_store.list_jobs(limit)}
+
+
+@app.get("/jobs/{job_id}", tags=["jobs"])
+def get_job(job_id: str):
+    profile = require_job_profile(job_id)
+    out = _job_summary(job_id, profile.get("title"), profile)
+    out["job_description"] = profile["job_description"]
+    return out
+
+
+@app.delete("/jobs/{job_id}", tags=["jobs"])
+def delete_job(job_id: str):
+    if not db_store.delete_job(job_id):
+        raise HTTPException(status_code=404, detail="Unknown job_id.")
+    job_profiles.pop(job_id)
+    return {"status": "ok", "job_id": job_id}
+
+
 # ---------------- Analyze Endpoint ---------------- #
 
 class AnalyzeRequest(BaseModel):
     pdf_id: Optional[str] = None
     file_path: Optional[str] = None  # kept for future if needed
     job_description: Optional[str] = None
+    job_id: Optional[str] = None  # registered via /jobs; takes precedence over job_description
     force: Optional[bool] = False
+    max_pages: Optional[int] = None  # score only the first N pages (EXTRACT_MAX_PAGES caps it server-side)
+    fields: Optional[List[str]] = None  # same as ?fields=; only these analysis fields are computed/returned
+
+
+def first_memoized(keys: List[str]) -> Optional[dict]:
+    """The first memoized analysis among keys (checked in order), or None."""
+    for key in keys:
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            return cached
+    return None
+
+
+async def analyze_upload(
+    pdf_path: str, sha: str, job_desc: str, profile: Optional[dict], max_pages: int, force: bool = False,
+    fields: Optional[frozenset] = None,
+) -> tuple:
+    """
+    Memoized single-resume analysis shared by /analyze and the bulk dispatcher.
+    With `fields`, optional stages nobody asked for are skipped and the result is
+    projected to those fields. A memoized full analysis serves any projection;
+    partial ones are memoized under their own key.
+    Returns (analysis or None if the PDF has no text, cached); raises PoolSaturated.
+    """
+    jd_sha = profile["jd_sha"] if profile else jd_sha256(job_desc)
+    budget = f":p{max_pages}:c{EXTRACT_MAX_CHARS}" if budget_active(max_pages) else ""
+    skip = tuple(f for f in OPTIONAL_ANALYSIS_FIELDS if fields is not None and f not in fields)
+    memo_key = lambda tax_version, skip=skip: AnalysisCache.make_key(
+        sha, jd_sha, f"{tax_version}:{ANALYSIS_VERSION}{budget}" + "".join(f":-{f}" for f in skip))
+    if not force:
+        tax_version = taxonomy.current().version
+        keys = [memo_key(tax_version, ())] + ([memo_key(tax_version)] if skip else [])
+        with metrics.stage("memo_lookup"):
+            cached = await run_in_threadpool(first_memoized, keys)
+        if cached is not None:
+            return project(cached, fields), True
+
+    # 1.-6. run in a worker process (text comes from the cache when we have it)
+    cached_text = await run_in_threadpool(full_text_cached, sha, max_pages)
+    extracted, analysis = await analysis_pool.run(
+        run_analysis, pdf_path, cached_text, job_desc, profile, sha, max_pages, skip
+    )
+    if extracted and extracted.strip():
+        await run_in_threadpool(text_cache.put, sha, extracted)
+    if analysis is None:
+        return None, False
+
+    # keyed by the taxonomy the worker actually used (it may have reloaded a newer one)
+    with metrics.stage("memo_store"):
+        await run_in_threadpool(analysis_cache.put, memo_key(analysis["taxonomy_version"]), analysis)
+    return project(analysis, fields), False
 
 
 @app.post("/analyze", tags=["analyze"])
-async def analyze_resume(req: AnalyzeRequest):
+async def analyze_resume(req: AnalyzeRequest, request: Request, fields: Optional[str] = None):
     """
     Offline ATS-style analysis: compare resume vs job description, detect
     skills, compute a match score, and generate suggestions.
+    ?fields=ats_score,missing_skills_job returns (and computes) only those fields;
+    `Accept: application/msgpack` switches the body to MessagePack.
     """
     if not req.pdf_id:
         raise HTTPException(status_code=400, detail="pdf_id is required.")
+    wanted = parse_fields(fields if fields is not None else req.fields)
 
-    pdf_path = os.path.join(UPLOAD_DIR, req.pdf_id)
-    if not os.path.exists(pdf_path):
-        raise HTTPException(status_code=404, detail="Uploaded file not found on server.")
+    # the stored content hash comes from db_store; the file itself is only read on a miss
+    pdf_path, sha = await run_in_threadpool(require_upload, req.pdf_id)
 
-    # 1. Extract text from resume
-    resume_text = extract_text_from_pdf(pdf_path)
-    if not resume_text.strip():
+    profile = await run_in_threadpool(require_job_profile, req.job_id) if req.job_id else None
+    job_desc = profile["job_description"] if profile else normalize_jd(req.job_description)
+    if req.max_pages is not None and req.max_pages < 1:
+        raise HTTPException(status_code=400, detail="max_pages must be at least 1.")
+    max_pages = effective_max_pages(req.max_pages)
+    try:
+        analysis, cached = await analyze_upload(pdf_path, sha, job_desc, profile, max_pages, req.force, wanted)
+    except ExtractionError as e:
+        raise extraction_failed(e)
+    except PoolSaturated:
+        raise pool_busy()
+    if analysis is None:
         raise HTTPException(
             status_code=400,
             detail="Could not extract text from the PDF. Make sure it's not just images.",
         )
+    return negotiated(request, {"analysis": analysis, "cached": cached})
 
-    job_desc = req.job_description or ""
 
-    # 2. Tokenize
-    resume_tokens = tokenize(resume_text)
-    jd_tokens = tokenize(job_desc) if job_desc else []
+# ---------------- Batch Ranking Endpoint ---------------- #
 
-    # 3. Detect skills in resume
-    tech_found = find_skills(resume_text, TECH_SKILLS)
-    soft_found = find_skills(resume_text, SOFT_SKILLS)
+class BatchAnalyzeRequest(BaseModel):
+    pdf_ids: List[str]
+    job_description: Optional[str] = None
+    job_id: Optional[str] = None
+    top_k: Optional[int] = None
+    fields: Optional[List[str]] = None  # columns of each ranked entry besides rank/pdf_id (see BATCH_FIELDS)
 
-    # 4. Determine which skills JD is asking for & missing skills
-    job_targets = get_job_skill_targets(job_desc)
-    missing_skills_job = [
-        s for s in job_targets if s not in tech_found and s not in soft_found
-    ]
 
-    # 5. Similarity & ATS score
-    similarity = jaccard_similarity(resume_tokens, jd_tokens)
-    ats_score = compute_ats_score(
-        job_targets=job_targets,
-        missing_skills=missing_skills_job,
-        resume_tokens=resume_tokens,
-        jd_tokens=jd_tokens,
-        resume_skills_count=len(tech_found) + len(soft_found),
-        resume_length=len(resume_text),
-    )
+def score_resume_chunk(items: List[tuple], profile: dict) -> List[tuple]:
+    """
+    Worker-side batch scoring. items are (pdf_id, pdf_path, cached_text or None, sha);
+    returns (pdf_id, freshly extracted text or None, scored dict) per item.
+    Features are extracted per resume, then the whole chunk is scored with one
+    vectorised scoring_matrix call (same results as score_resume).
+    """
+    if profile["dictionary_version"] != taxonomy.current().version:
+        profile = build_job_profile(profile["job_description"])
+    out, features, ok_rows = [], [], []
+    for pdf_id, pdf_path, cached_text, sha in items:
+        extracted = None
+        if cached_text is not None:
+            resume_text = cached_text
+        else:
+            try:
+                with metrics.stage("extract"):
+                    resume_text, complete = extract_pages(pdf_path, sha)
+            except ExtractionError as e:
+                out.append((pdf_id, None, {"pdf_id": pdf_id, "error": e.message, "error_code": e.code}))
+                continue
+            extracted = resume_text if complete else None
+        if not resume_text.strip():
+            out.append((pdf_id, None, {"pdf_id": pdf_id, "error": "Could not extract text from the PDF."}))
+            continue
+        with metrics.stage("features"):
+            features.append(resume_features(resume_text))
+        ok_rows.append((pdf_id, extracted))
+
+    if features:
+        with metrics.stage("score_matrix"):
+            matrix = score_matrix(features, [profile])
+        targets = profile["targets"]
+        for i, (pdf_id, extracted) in enumerate(ok_rows):
+            f = features[i]
+            found = set(f["skills"])
+            out.append((pdf_id, extracted, {
+                "pdf_id": pdf_id,
+                "ats_score": int(matrix["ats_score"][i, 0]),
+                "similarity": float(matrix["similarity"][i, 0]),
+                "missing_skills_job": [s for s in targets if s not in found],
+                "skills_found": f["tech_found"],
+                "soft_skills_found": f["soft_found"],
+            }))
+    return out
 
-    # 6. Suggestions
-    suggestions = build_suggestions(
-        job_desc=job_desc,
-        job_targets=job_targets,
-        missing_skills=missing_skills_job,
-        tech_found=tech_found,
-        soft_found=soft_found,
-        resume_length=len(resume_text),
-        similarity=similarity,
+
+def resolve_batch_items(pdf_ids: List[str]) -> tuple:
+    """
+    (error entries for unknown pdf_ids, (pdf_id, pdf_path, cached text or None, sha) work items)
+    """
+    errors, items = [], []
+    for pdf_id in pdf_ids:
+        found = resolve_upload(pdf_id)
+        if found is None:
+            errors.append({"pdf_id": pdf_id, "error": "Uploaded file not found on server."})
+            continue
+        pdf_path, sha = found
+        items.append((pdf_id, pdf_path, full_text_cached(sha), sha))
+    return errors, items
+
+
+@app.post("/analyze/batch", tags=["analyze"])
+async def analyze_batch(req: BatchAnalyzeRequest, request: Request, fields: Optional[str] = None):
+    """
+    Rank many uploaded resumes against one job description. The JD is
+    tokenized and profiled once; resumes are extracted and scored in parallel.
+    ?fields= trims each ranked entry; MessagePack via `Accept: application/msgpack`.
+    """
+    wanted = parse_fields(fields if fields is not None else req.fields, BATCH_FIELDS)
+    if not req.pdf_ids:
+        raise HTTPException(status_code=400, detail="pdf_ids must not be empty.")
+    if req.top_k is not None and req.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1.")
+
+    if req.job_id:
+        profile = await run_in_threadpool(require_job_profile, req.job_id)
+    else:
+        profile = build_job_profile(normalize_jd(req.job_description))
+    pdf_ids = list(dict.fromkeys(req.pdf_ids))
+
+    results, items = await run_in_threadpool(resolve_batch_items, pdf_ids)
+
+    # one chunk per worker so the batch takes a bounded number of queue slots
+    n_chunks = max(1, min(len(items), analysis_pool.max_workers))
+    chunks = [items[k::n_chunks] for k in range(n_chunks)]
+    try:
+        chunk_results = await analysis_pool.run_many(
+            score_resume_chunk, [(chunk, profile) for chunk in chunks if chunk]
+        )
+    except PoolSaturated:
+        raise pool_busy()
+    sha_by_id = {it[0]: it[3] for it in items}
+    fresh = []
+    for chunk in chunk_results:
+        for pdf_id, extracted, scored in chunk:
+            if extracted:
+                fresh.append((sha_by_id[pdf_id], extracted))
+            results.append(scored)
+    if fresh:
+        await run_in_threadpool(cache_texts, fresh)
+
+    errors = [r for r in results if "error" in r]
+    scored = [r for r in results if "error" not in r]
+    rank_key = lambda r: (r["ats_score"], r["similarity"])
+    if req.top_k is not None:
+        ranked = heapq.nlargest(req.top_k, scored, key=rank_key)
+    else:
+        ranked = sorted(scored, key=rank_key, reverse=True)
+
+    return negotiated(request, {
+        "job_targets": profile["targets"],
+        "total": len(pdf_ids),
+        "scored": len(scored),
+        "ranked": [
+            {
+                "rank": i + 1,
+                "pdf_id": r["pdf_id"],
+                **project({
+                    "ats_score": r["ats_score"],
+                    "similarity": round(r["similarity"], 4),
+                    "missing_skills_job": r["missing_skills_job"],
+                    "skills_found": r["skills_found"],
+                    "soft_skills_found": r["soft_skills_found"],
+                }, wanted, BATCH_FIELDS),
+            }
+            for i, r in enumerate(ranked)
+        ],
+        "errors": errors,
+    })
+
+
+# ---------------- Bulk Runs (durable, streamed) ---------------- #
+
+class BulkRequest(BaseModel):
+    pdf_ids: List[str]
+    job_description: Optional[str] = None
+    job_id: Optional[str] = None
+    max_pages: Optional[int] = None
+
+
+async def run_bulk_item(item: dict) -> bool:
+    """
+    Analyze one leased item and store its result. Returns False when the pool was
+    full and the item went back to the queue.
+    """
+    bulk_id, seq, pdf_id = item["bulk_id"], item["seq"], item["pdf_id"]
+    ok, result = False, {"pdf_id": pdf_id}
+    try:
+        profile = await run_in_threadpool(get_job_profile, item["job_id"])
+        found = await run_in_threadpool(resolve_upload, pdf_id)
+        if profile is None:
+            result["error"] = "The run's job_id no longer exists."
+        elif found is None:
+            result["error"] = "Uploaded file not found on server."
+        else:
+            analysis, cached = await analyze_upload(
+                found[0], found[1], profile["job_description"], profile, item["max_pages"] or 0
+            )
+            if analysis is None:
+                result["error"] = "Could not extract text from the PDF."
+            else:
+                ok = True
+                result.update(analysis=analysis, cached=cached)
+    except PoolSaturated:
+        await run_in_threadpool(db_store.release_bulk_item, bulk_id, seq, BULK_OWNER)
+        return False
+    except ExtractionError as e:
+        result.update(error=e.message, error_code=e.code)
+    except Exception as e:
+        result["error"] = f"Analysis failed: {e}"
+    await run_in_threadpool(db_store.finish_bulk_item, bulk_id, seq, BULK_OWNER, result, ok)
+    return True
+
+
+async def bulk_dispatcher():
+    """
+    Keep up to BULK_CONCURRENCY leased items in flight on analysis_pool, renewing the
+    leases while they run. Wakes on new runs, finished items, or every BULK_POLL_SECONDS.
+    """
+    running = {}  # task -> item
+    renewed = time.monotonic()
+    try:
+        while True:
+            bulk_wakeup.clear()
+            claimed = []
+            try:
+                if running and time.monotonic() - renewed > BULK_LEASE_SECONDS / 3:
+                    await run_in_threadpool(db_store.renew_bulk_leases, BULK_OWNER, BULK_LEASE_SECONDS)
+                    renewed = time.monotonic()
+                # the read-only probe keeps an idle queue from taking SQLite's write lock every poll
+                if len(running) < BULK_CONCURRENCY and await run_in_threadpool(db_store.bulk_items_claimable):
+                    claimed = await run_in_threadpool(
+                        db_store.claim_bulk_items, BULK_OWNER, BULK_CONCURRENCY - len(running),
+                        BULK_LEASE_SECONDS, BULK_MAX_ATTEMPTS,
+                    )
+            except Exception as e:
+                print(f"bulk dispatcher: claim failed: {e}")
+            for item in claimed:
+                running[asyncio.create_task(run_bulk_item(item))] = item
+            if claimed and len(running) < BULK_CONCURRENCY:
+                continue  # the queue may hold more than one claim's worth
+
+            wake = asyncio.ensure_future(bulk_wakeup.wait())
+            done, _ = await asyncio.wait(
+                set(running) | {wake}, timeout=BULK_POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED
+            )
+            wake.cancel()
+            saturated = False
+            for task in done:
+                if task is wake:
+                    continue
+                item = running.pop(task)
+                if task.exception() is not None:
+                    print(f"bulk dispatcher: {item['bulk_id']}#{item['seq']} failed: {task.exception()}")
+                elif task.result() is False:
+                    saturated = True
+            if saturated:
+                await asyncio.sleep(BULK_POLL_SECONDS)
+    finally:
+        # hand in-flight items back so a restarted process picks them up without waiting for the lease
+        for task, item in running.items():
+            task.cancel()
+            db_store.release_bulk_item(item["bulk_id"], item["seq"], BULK_OWNER)
+
+
+def _bulk_progress(run: dict) -> dict:
+    done = run["completed"] + run["failed"]
+    return dict(run, progress=round(done / run["total"], 4) if run["total"] else 1.0)
+
+
+def require_bulk_run(bulk_id: str) -> dict:
+    run = db_store.get_bulk_run(bulk_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Unknown bulk_id.")
+    return run
+
+
+@app.post("/bulk", tags=["bulk"], status_code=202)
+async def submit_bulk(req: BulkRequest):
+    """
+    Queue a bulk analysis of many uploaded resumes against one job. Returns at once;
+    follow it with GET /bulk/{bulk_id}, /results or /stream. A raw job_description
+    is registered as a job (see /jobs) so the run survives restarts without it.
+    """
+    if not req.pdf_ids:
+        raise HTTPException(status_code=400, detail="pdf_ids must not be empty.")
+    if req.max_pages is not None and req.max_pages < 1:
+        raise HTTPException(status_code=400, detail="max_pages must be at least 1.")
+    pdf_ids = list(dict.fromkeys(req.pdf_ids))
+    if len(pdf_ids) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ITEMS} pdf_ids per run.")
+    if req.job_id:
+        job_id = (await run_in_threadpool(require_job_profile, req.job_id))["job_id"]
+    else:
+        job_id = (await run_in_threadpool(register_job, req.job_description, None, True))["job_id"]
+
+    bulk_id = uuid.uuid4().hex
+    await run_in_threadpool(db_store.create_bulk_run, bulk_id, job_id, pdf_ids, effective_max_pages(req.max_pages))
+    if bulk_wakeup is not None:
+        bulk_wakeup.set()
+    return {"bulk_id": bulk_id, "job_id": job_id, "status": "queued", "total": len(pdf_ids)}
+
+
+@app.get("/bulk", tags=["bulk"])
+def list_bulk_runs(limit: int = 100):
+    return {"runs": [_bulk_progress(r) for r in db_store.list_bulk_runs(limit)]}
+
+
+@app.get("/bulk/{bulk_id}", tags=["bulk"])
+def get_bulk_run(bulk_id: str):
+    return _bulk_progress(require_bulk_run(bulk_id))
+
+
+def _bulk_result(result: dict, n: int, seq: int, fields: Optional[frozenset]) -> dict:
+    if fields is not None and "analysis" in result:
+        result = dict(result, analysis=project(result["analysis"], fields))
+    return dict(result, n=n, index=seq)
+
+
+@app.get("/bulk/{bulk_id}/results", tags=["bulk"])
+def get_bulk_results(bulk_id: str, request: Request, after: int = 0, limit: int = 100, fields: Optional[str] = None):
+    """
+    Finished items in completion order; pass the returned `next` as `after` to page on.
+    ?fields= projects each analysis; MessagePack via `Accept: application/msgpack`.
+    """
+    wanted = parse_fields(fields)
+    run = require_bulk_run(bulk_id)
+    rows = db_store.bulk_results(bulk_id, after, max(1, min(limit, 1000)))
+    return negotiated(request, {
+        **_bulk_progress(run),
+        "results": [_bulk_result(result, n, seq, wanted) for n, seq, result in rows],
+        "next": rows[-1][0] if rows else after,
+    })
+
+
+@app.get("/bulk/{bulk_id}/stream", tags=["bulk"])
+async def stream_bulk_run(
+    bulk_id: str, request: Request, after: int = 0, format: Optional[str] = None, fields: Optional[str] = None
+):
+    """
+    Per-resume results as they complete, with progress events, until the run ends.
+    NDJSON by default; Server-Sent Events with `Accept: text/event-stream` or
+    ?format=sse (reconnects resume from Last-Event-ID). `after` skips results already
+    seen; ?fields= projects each analysis. After a cancel the stream stays open until
+    items that were already leased have reported (or their leases ran out).
+    """
+    wanted = parse_fields(fields)
+    await run_in_threadpool(require_bulk_run, bulk_id)
+    sse = format == "sse" or (format is None and "text/event-stream" in request.headers.get("accept", ""))
+    last_event_id = request.headers.get("last-event-id", "")
+    if sse and last_event_id.isdigit():
+        after = int(last_event_id)
+
+    def frame(event: str, data: dict, event_id: Optional[int] = None) -> str:
+        if not sse:
+            return json.dumps(dict(data, event=event), separators=(",", ":")) + "\n"
+        head = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+    async def events():
+        cursor, last_state, last_sent = after, None, time.monotonic()
+        while True:
+            rows = await run_in_threadpool(db_store.bulk_results, bulk_id, cursor, 200)
+            for n, seq, result in rows:
+                yield frame("result", _bulk_result(result, n, seq, wanted), n)
+                cursor = n
+            run = await run_in_threadpool(db_store.get_bulk_run, bulk_id)
+            state = (run["status"], run["completed"], run["failed"])
+            if rows or state != last_state or time.monotonic() - last_sent > 15:
+                yield frame("progress", _bulk_progress(run))
+                last_state, last_sent = state, time.monotonic()
+            if run["status"] not in ("queued", "running") and cursor >= run["completed"] + run["failed"]:
+                # a cancelled run's already-leased items still report; end once none can
+                if run["status"] != "cancelled" or not await run_in_threadpool(db_store.live_bulk_leases, bulk_id):
+                    yield frame("end", _bulk_progress(run))
+                    return
+            if len(rows) < 200:
+                if await request.is_disconnected():
+                    return
+                await asyncio.sleep(BULK_POLL_SECONDS)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    preview = resume_text[:2000]
 
-    return {
-        "analysis": {
-            "ats_score": ats_score,
-            "missing_skills_job": missing_skills_job,
-            "suggestions": suggestions,
-            "skills_found": tech_found,
-            "soft_skills_found": soft_found,
-            "raw_text_preview": preview,
-        }
-    }
+@app.delete("/bulk/{bulk_id}", tags=["bulk"])
+def cancel_bulk_run(bulk_id: str):
+    """Stop a run; results already stored stay readable."""
+    require_bulk_run(bulk_id)
+    db_store.cancel_bulk_run(bulk_id)
+    return _bulk_progress(require_bulk_run(bulk_id))
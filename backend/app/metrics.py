@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+metrics.py - per-stage timings exposed as Prometheus histograms and Server-Timing
+stage("extract") times a block. Inside a request (see collect()) timings are
+gathered per request, then observed into the histograms and summed into the
+response's Server-Timing header; outside one they go straight to the histograms.
+Work run in analysis_pool workers is wrapped in timed_call(), which returns the
+worker's timings with the result so the parent can record them.
+With METRICS_ENABLED=0, stage() hands back a shared no-op context manager and
+timed() leaves functions undecorated.
+"""
+import os, time, threading, contextvars
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional, Tuple
+
+ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# seconds; PDF parsing of long resumes can take a while, cache hits are sub-millisecond
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL = nullcontext()
+_current = contextvars.ContextVar("metrics_timings", default=None)
+
+class Histogram:
+    def __init__(self, name: str, help: str, label: str, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: str, seconds: float):
+        with self._lock:
+            s = self._series.get(value)
+            if s is None:
+                s = self._series[value] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    s[i] += 1
+            s[-2] += seconds
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for value, s in series:
+            label = f'{self.label}="{_escape(value)}"'
+            for i, bound in enumerate(self.buckets):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {s[i]}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {s[-1]}')
+            lines.append(f"{self.name}_sum{{{label}}} {s[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {s[-1]}")
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+stage_seconds = Histogram("resume_stage_seconds", "Time spent per analysis stage.", "stage")
+request_seconds = Histogram("resume_request_seconds", "Request latency per route.", "route")
+
+# ---- recording ----
+
+def record(timings: List[Tuple[str, float]]):
+    """Add (stage, seconds) pairs to the current request, or to the histograms if there is none."""
+    if not timings:
+        return
+    current = _current.get()
+    if current is not None:
+        current.extend(timings)
+    else:
+        for name, seconds in timings:
+            stage_seconds.observe(name, seconds)
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record([(self.name, time.perf_counter() - self.t0)])
+        return False
+
+def stage(name: str):
+    """Context manager timing one stage: `with metrics.stage("tokenize"): ...`"""
+    if not ENABLED:
+        return _NULL
+    return _Stage(name)
+
+def timed(name: str) -> Callable:
+    """Decorator form of stage(); a no-op when metrics are disabled."""
+    def wrap(fn):
+        if not ENABLED:
+            return fn
+        def timed_fn(*args, **kwargs):
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        timed_fn.__name__ = fn.__name__
+        timed_fn.__doc__ = fn.__doc__
+        timed_fn.__wrapped__ = fn
+        return timed_fn
+    return wrap
+
+def timed_call(fn: Callable, *args):
+    """Worker-side: (fn(*args), [(stage, seconds), ...] measured while it ran)."""
+    timings = []
+    token = _current.set(timings)
+    try:
+        return fn(*args), timings
+    finally:
+        _current.reset(token)
+
+# ---- per-request collection ----
+
+def collect() -> Tuple[List[Tuple[str, float]], contextvars.Token]:
+    timings = []
+    return timings, _current.set(timings)
+
+def finish(timings: List[Tuple[str, float]], token, route: Optional[str], seconds: float) -> str:
+    """Observe a finished request's timings; returns the Server-Timing header value."""
+    _current.reset(token)
+    totals: Dict[str, float] = {}
+    for name, s in timings:
+        stage_seconds.observe(name, s)
+        totals[name] = totals.get(name, 0.0) + s
+    if route:
+        request_seconds.observe(route, seconds)
+    parts = [f"{name};dur={s * 1000:.2f}" for name, s in totals.items()]
+    parts.append(f"total;dur={seconds * 1000:.2f}")
+    return ", ".join(parts)
+
+def render() -> str:
+    """Prometheus text exposition format (0.0.4)."""
+    return "\n".join(stage_seconds.render() + request_seconds.render()) + "\n"
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+pdf_sandbox.py - PyPDF2 runs in a resource-limited helper process
+A malformed or hostile PDF (deep object graphs, huge streams) can make PyPDF2 spin
+or allocate without bound. read_pages() therefore hands the parsing to a child
+process (`python -m app.pdf_sandbox`, one per calling thread and process) that runs
+under an RLIMIT_AS cap. The parent gives each request PDF_SANDBOX_TIMEOUT seconds
+of wall-clock time and kills the child when that runs out. The child is also
+replaced after PDF_SANDBOX_RECYCLE_AFTER documents, which bounds heap fragmentation.
+Every failure is raised as an ExtractionError carrying a code, never as empty text.
+PDF_SANDBOX=0 parses in-process with the same page limit and error codes.
+
+Protocol: one JSON object per line on the child's stdin/stdout.
+"""
+import os, sys, json, time, select, atexit, threading, subprocess
+from typing import List, Optional, Tuple
+
+ENABLED = os.getenv("PDF_SANDBOX", "1").lower() in ("1", "true", "yes")
+TIMEOUT = float(os.getenv("PDF_SANDBOX_TIMEOUT", 20.0))
+MEMORY_MB = int(os.getenv("PDF_SANDBOX_MEMORY_MB", 1024))
+RECYCLE_AFTER = int(os.getenv("PDF_SANDBOX_RECYCLE_AFTER", 50))
+# documents with more pages are rejected outright (0 = no limit)
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 100))
+
+class ExtractionError(Exception):
+    """A PDF that could not be read. code: not_found, invalid_pdf, too_many_pages, timeout, memory or crashed."""
+    def __init__(self, code: str, message: str):
+        super().__init__(code, message)
+        self.code = code
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+    def to_dict(self) -> dict:
+        return {"code": self.code, "message": self.message}
+
+def read_pages_local(path: str, start: int = 0, max_pages: int = 0, max_chars: int = 0,
+                     page_limit: int = MAX_PAGES) -> Tuple[int, List[str]]:
+    """
+    (page count, texts of pages start, start+1, ...) in this process, stopping before
+    page max_pages or once more than max_chars characters were read (0 = no limit).
+    """
+    from PyPDF2 import PdfReader
+    if not os.path.exists(path):
+        raise ExtractionError("not_found", "Uploaded file not found on server.")
+    try:
+        reader = PdfReader(path)
+        n_pages = len(reader.pages)
+    except MemoryError:
+        raise
+    except Exception as e:
+        raise ExtractionError("invalid_pdf", f"Could not parse the PDF: {e}")
+    if page_limit and n_pages > page_limit:
+        raise ExtractionError("too_many_pages", f"The PDF has {n_pages} pages; at most {page_limit} are accepted.")
+    texts, chars = [], 0
+    end = min(n_pages, max_pages) if max_pages else n_pages
+    for page in range(start, end):
+        try:
+            text = reader.pages[page].extract_text() or ""
+        except MemoryError:
+            raise
+        except Exception as e:
+            raise ExtractionError("invalid_pdf", f"Could not read page {page + 1}: {e}")
+        texts.append(text)
+        chars += len(text) + 1
+        if max_chars and chars > max_chars:
+            break
+    return n_pages, texts
+
+class Sandbox:
+    """One extraction child process, started on first use and replaced when it fails or is due for recycling."""
+    def __init__(self):
+        self.owner = os.getpid()
+        self.proc: Optional[subprocess.Popen] = None
+        self.docs = 0
+        self._buf = bytearray()
+
+    def _start(self):
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (backend_dir, env.get("PYTHONPATH")) if p)
+        self.proc = subprocess.Popen([sys.executable, "-m", "app.pdf_sandbox"], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, env=env, close_fds=True)
+        self.docs = 0
+        self._buf = bytearray()
+
+    def stop(self):
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            proc.kill()
+        except OSError:
+            pass
+        proc.wait()
+        for f in (proc.stdin, proc.stdout):
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def _read_line(self, deadline: float) -> Optional[bytes]:
+        """One reply line, None if the child exited; raises TimeoutError at the deadline."""
+        fd = self.proc.stdout.fileno()
+        while True:
+            end = self._buf.find(b"\n")
+            if end >= 0:
+                line = bytes(self._buf[:end])
+                del self._buf[:end + 1]
+                return line
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError
+            if not select.select([fd], [], [], remaining)[0]:
+                continue
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                return None
+            self._buf += chunk
+
+    def read_pages(self, path: str, start: int = 0, max_pages: int = 0, max_chars: int = 0) -> Tuple[int, List[str]]:
+        if self.proc is None or self.proc.poll() is not None:
+            self._start()
+        request = {"path": os.path.abspath(path), "start": start, "max_pages": max_pages, "max_chars": max_chars}
+        try:
+            self.proc.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            self.proc.stdin.flush()
+            line = self._read_line(time.monotonic() + TIMEOUT)
+        except TimeoutError:
+            self.stop()
+            raise ExtractionError("timeout", f"PDF extraction took longer than {TIMEOUT:g}s.")
+        except OSError as e:
+            self.stop()
+            raise ExtractionError("crashed", f"The PDF extraction process failed: {e}")
+        if line is None:
+            self.stop()
+            raise ExtractionError("crashed", "The PDF extraction process died (memory limit or crash).")
+        reply = json.loads(line)
+        self.docs += 1
+        if self.docs >= RECYCLE_AFTER or reply.get("code") == "memory":
+            self.stop()  # due for recycling, or it hit the memory cap and may be in a bad state
+        if not reply["ok"]:
+            raise ExtractionError(reply["code"], reply["message"])
+        return reply["n_pages"], reply["texts"]
+
+_local = threading.local()
+_sandboxes: List[Sandbox] = []
+_sandboxes_lock = threading.Lock()
+
+def _sandbox() -> Sandbox:
+    sb = getattr(_local, "sandbox", None)
+    if sb is None or sb.owner != os.getpid():  # a forked process must not share its parent's child
+        sb = _local.sandbox = Sandbox()
+        with _sandboxes_lock:
+            _sandboxes.append(sb)
+    return sb
+
+def read_pages(path: str, start: int = 0, max_pages: int = 0, max_chars: int = 0) -> Tuple[int, List[str]]:
+    """read_pages_local(), in this thread's sandbox process unless PDF_SANDBOX=0."""
+    if not ENABLED:
+        try:
+            return read_pages_local(path, start, max_pages, max_chars)
+        except MemoryError:
+            raise ExtractionError("memory", "The PDF needs more memory than extraction allows.")
+    if not os.path.exists(path):
+        raise ExtractionError("not_found", "Uploaded file not found on server.")
+    return _sandbox().read_pages(path, start, max_pages, max_chars)
+
+@atexit.register
+def shutdown():
+    with _sandboxes_lock:
+        for sb in _sandboxes:
+            if sb.owner == os.getpid():
+                sb.stop()
+        _sandboxes.clear()
+
+# ---- child process ----
+
+def _limit_memory():
+    try:
+        import resource
+        limit = MEMORY_MB * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def main():
+    import PyPDF2  # noqa: F401  (imported before the memory cap applies)
+    # built up front: once the cap is hit there may be no memory left to encode it
+    out_of_memory = json.dumps({"ok": False, "code": "memory",
+                                "message": f"The PDF needs more than {MEMORY_MB} MB to extract."}).encode("utf-8") + b"\n"
+    _limit_memory()
+    # replies go to the original stdout; anything a library prints lands on stderr
+    out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    for line in sys.stdin.buffer:
+        try:
+            req = json.loads(line)
+            try:
+                n_pages, texts = read_pages_local(req["path"], req["start"], req["max_pages"], req["max_chars"])
+                reply = {"ok": True, "n_pages": n_pages, "texts": texts}
+            except ExtractionError as e:
+                reply = {"ok": False, **e.to_dict()}
+            out.write(json.dumps(reply).encode("utf-8") + b"\n")
+        except MemoryError:
+            reply = texts = None
+            out.write(out_of_memory)
+            out.flush()
+            return 1
+        out.flush()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
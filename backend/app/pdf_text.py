@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+pdf_text.py - lazy, page-wise PDF text extraction with page/character budgets
+iter_pages() is a generator: the PDF is only parsed (in the extraction sandbox, see
+pdf_sandbox.py) when a page is not in the page cache, and only as far as the page
+and character budgets reach, so a preview stops after a couple of pages and a later
+full analysis re-extracts only the pages not seen yet. extract_text() joins pages
+under a budget and reports whether the result covers the whole document.
+Unreadable PDFs raise pdf_sandbox.ExtractionError.
+"""
+from typing import Iterator, Optional, Tuple
+from .pdf_sandbox import read_pages
+
+def iter_pages(path: str, sha: Optional[str] = None, page_cache=None,
+               max_pages: int = 0, max_chars: int = 0) -> Iterator[Tuple[int, str, int]]:
+    """
+    Yield (page number, text, page count) in page order; max_pages=0 means all pages.
+    Uncached pages are read in one sandbox call, up to roughly max_chars characters.
+    """
+    use_cache = page_cache is not None and sha is not None
+    n_pages = page_cache.get_count(sha) if use_cache else None
+    fetched = {}
+    page = 0
+    while n_pages is None or page < n_pages:
+        if max_pages and page >= max_pages:
+            return
+        text = page_cache.get_page(sha, page) if use_cache else None
+        if text is None:
+            text = fetched.pop(page, None)
+        if text is None:
+            n_pages, texts = read_pages(path, page, max_pages, max_chars)
+            if use_cache:
+                page_cache.put_count(sha, n_pages)
+            fetched = {page + i: t for i, t in enumerate(texts)}
+            if use_cache:
+                for p, t in fetched.items():
+                    page_cache.put_page(sha, p, t)
+            text = fetched.pop(page, None)
+            if text is None:
+                return
+        yield page, text, n_pages
+        page += 1
+
+def extract_text(path: str, sha: Optional[str] = None, page_cache=None, max_pages: int = 0,
+                 max_chars: int = 0, skip_empty: bool = False) -> Tuple[str, bool, int]:
+    """
+    Pages joined with newlines, stopping once max_pages pages or max_chars characters
+    are read (0 = no limit). Returns (text, complete, pages read); complete is False
+    when a budget cut the document short.
+    """
+    texts, chars, pages_read, n_pages = [], 0, 0, 0
+    stopped = False
+    for page, text, n_pages in iter_pages(path, sha, page_cache, max_pages, max_chars):
+        pages_read = page + 1
+        if text or not skip_empty:
+            texts.append(text)
+            chars += len(text) + 1
+        if max_chars and chars > max_chars and pages_read < n_pages:
+            stopped = True
+            break
+    full = "\n".join(texts)
+    complete = not stopped and pages_read >= n_pages
+    if max_chars and len(full) > max_chars:
+        full, complete = full[:max_chars], False
+    return full, complete, pages_read
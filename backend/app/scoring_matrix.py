@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+scoring_matrix.py - vectorised ATS scoring for N resumes x M job descriptions
+Tokens and skills are interned into vocabularies; resumes and JDs become sparse
+binary matrices, so every pairwise intersection comes out of one matrix product.
+The ATS formula is then applied element-wise with exactly the same float64 steps
+as main.compute_ats_score, so scores match the scalar path bit for bit.
+Uses scipy.sparse (listed in requirements.txt); without it the same products run on
+dense NumPy arrays, which the tests cover as well.
+"""
+from typing import List, Dict, Iterable
+import numpy as np
+
+try:
+    from scipy import sparse
+except Exception:
+    sparse = None
+
+class Vocabulary:
+    def __init__(self):
+        self.index = {}
+
+    def ids(self, items: Iterable[str]) -> List[int]:
+        index = self.index
+        out = []
+        for it in items:
+            i = index.get(it)
+            if i is None:
+                i = index[it] = len(index)
+            out.append(i)
+        return out
+
+    def __len__(self):
+        return len(self.index)
+
+def binary_matrix(rows: List[List[int]], n_cols: int):
+    """One row per document with a 1 in every column it contains (ids must be unique per row)."""
+    n_cols = max(1, n_cols)
+    if sparse is not None:
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in rows], out=indptr[1:])
+        indices = np.fromiter((i for r in rows for i in r), dtype=np.int32, count=int(indptr[-1]))
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), n_cols))
+    mat = np.zeros((len(rows), n_cols), dtype=np.float32)
+    for r, ids in enumerate(rows):
+        mat[r, ids] = 1.0
+    return mat
+
+def intersection_counts(a, b) -> np.ndarray:
+    """|row_i(a) & row_j(b)| for every pair, as an int64 (N, M) array."""
+    prod = a @ b.T
+    if sparse is not None and sparse.issparse(prod):
+        prod = prod.toarray()
+    return np.rint(np.asarray(prod)).astype(np.int64)
+
+def row_sizes(m) -> np.ndarray:
+    return np.rint(np.asarray(m.sum(axis=1)).ravel()).astype(np.int64)
+
+def jaccard_matrix(resume_mat, jd_mat) -> np.ndarray:
+    inter = intersection_counts(resume_mat, jd_mat)
+    rs = row_sizes(resume_mat)[:, None]
+    js = row_sizes(jd_mat)[None, :]
+    union = rs + js - inter
+    out = np.zeros(inter.shape, dtype=np.float64)
+    ok = (rs > 0) & (js > 0) & (union > 0)
+    np.divide(inter, union, out=out, where=ok)
+    return out
+
+def ats_score_matrix(similarity: np.ndarray, matched: np.ndarray, n_targets: np.ndarray,
+                     skills_count: np.ndarray, resume_length: np.ndarray) -> np.ndarray:
+    """Element-wise main.compute_ats_score; n_targets is per JD, the other vectors per resume."""
+    n_targets = n_targets[None, :]
+    skills = skills_count[:, None]
+
+    # with JD skill targets: 60% word overlap, 40% skill coverage, small richness bonus
+    sim_pct = similarity * 100.0
+    total = np.maximum(1, n_targets)
+    coverage_pct = np.maximum(0.0, matched / total) * 100.0
+    raw = 0.6 * sim_pct + 0.4 * coverage_pct
+    raw = raw + np.where(skills > 10, 5, np.where(skills > 5, 2, 0))
+    with_targets = np.clip(np.trunc(raw).astype(np.int64), 10, 99)
+
+    # no targets: resume richness only
+    base = np.where(resume_length < 800, 55, np.where(resume_length < 1500, 65, 75))
+    base = base + np.where(skills_count > 12, 10, np.where(skills_count > 7, 5, 0))
+    without_targets = np.clip(base, 40, 95)[:, None]
+
+    return np.where(n_targets > 0, with_targets, without_targets)
+
+def score_matrix(resumes: List[Dict], jobs: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    resumes: dicts with token_set (set of tokens), skills (all skills found), length (chars)
+    jobs: job profiles with tokens and targets (see main.build_job_profile)
+    Returns (N, M) arrays: similarity (Jaccard), matched (targets covered), ats_score.
+    """
+    vocab, skills = Vocabulary(), Vocabulary()
+    jd_rows = [vocab.ids(set(j["tokens"])) for j in jobs]
+    target_rows = [skills.ids(set(j["targets"])) for j in jobs]
+    resume_rows = [vocab.ids(r["token_set"]) for r in resumes]
+    skill_rows = [skills.ids(set(r["skills"])) for r in resumes]
+
+    jd_mat = binary_matrix(jd_rows, len(vocab))
+    target_mat = binary_matrix(target_rows, len(skills))
+    resume_mat = binary_matrix(resume_rows, len(vocab))
+    skill_mat = binary_matrix(skill_rows, len(skills))
+
+    similarity = jaccard_matrix(resume_mat, jd_mat)
+    matched = intersection_counts(skill_mat, target_mat)
+    n_targets = row_sizes(target_mat)
+    ats = ats_score_matrix(
+        similarity, matched, n_targets,
+        np.array([len(r["skills"]) for r in resumes], dtype=np.int64),
+        np.array([r["length"] for r in resumes], dtype=np.int64),
+    )
+    return {"similarity": similarity, "matched": matched, "ats_score": ats}
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+search_index.py - incrementally maintained BM25 inverted index over resume text
+Layout under <root>:
+  CURRENT              generation number of the live base segment
+  seg-<gen>/           immutable base segment, memory-mapped on load
+      terms.json       term -> [offset, length] into the postings arrays
+      docs.json        doc keys (pdf_id) in docno order
+      doc_len.npy      token count per docno
+      post_docs.npy    docnos, grouped by term
+      post_tf.npy      term frequencies, parallel to post_docs
+  log-<gen>.jsonl      adds/deletes since that segment was written
+Adds and deletes are appended to the log and applied to an in-memory delta; once
+the delta is large it is merged into a new base segment (compaction). Other
+processes pick up log lines and new generations on their next call.
+"""
+import os, json, math, shutil, threading
+from typing import Dict, List, Tuple
+import numpy as np
+from .filelock import dir_lock
+
+def _load_array(path: str, dtype):
+    if not os.path.exists(path):
+        return np.zeros(0, dtype=dtype)
+    if os.path.getsize(path) <= 128:  # header only: empty array, which cannot be mmapped
+        return np.load(path)
+    return np.load(path, mmap_mode="r")
+
+class SearchIndex:
+    def __init__(self, root: str, k1: float = 1.2, b: float = 0.75, compact_threshold: int = 2000):
+        self.root = root
+        self.k1 = k1
+        self.b = b
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._gen = None
+        os.makedirs(root, exist_ok=True)
+        with self._lock:
+            self._sync()
+
+    # ---- persistence ----
+
+    def _file_lock(self):
+        return dir_lock(self.root)
+
+    def _read_gen(self) -> int:
+        try:
+            with open(os.path.join(self.root, "CURRENT"), "r") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _log_path(self, gen: int) -> str:
+        return os.path.join(self.root, f"log-{gen}.jsonl")
+
+    def _load_base(self, gen: int):
+        seg = os.path.join(self.root, f"seg-{gen}")
+        if os.path.isdir(seg):
+            with open(os.path.join(seg, "terms.json"), "r", encoding="utf-8") as f:
+                self._terms = json.load(f)
+            with open(os.path.join(seg, "docs.json"), "r", encoding="utf-8") as f:
+                self._base_keys = json.load(f)
+        else:
+            self._terms, self._base_keys = {}, []
+        self._doc_len = _load_array(os.path.join(seg, "doc_len.npy"), np.int32)
+        self._post_docs = _load_array(os.path.join(seg, "post_docs.npy"), np.int32)
+        self._post_tf = _load_array(os.path.join(seg, "post_tf.npy"), np.float32)
+        self._base_pos = {k: i for i, k in enumerate(self._base_keys)}
+        self._dead = np.zeros(len(self._base_keys), dtype=bool)
+        self._base_len_live = int(np.asarray(self._doc_len, dtype=np.int64).sum())
+        self._delta_docs = {}       # key -> (tf dict, length)
+        self._delta_postings = {}   # term -> {key: tf}
+        self._log_offset = 0
+        self._gen = gen
+
+    def _sync(self):
+        """Reload on a new generation, then apply log lines written since the last call."""
+        gen = self._read_gen()
+        if gen != self._gen:
+            self._load_base(gen)
+        path = self._log_path(gen)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if size <= self._log_offset:
+            return
+        with open(path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # ignore a trailing line still being written
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self._log_offset += end
+
+    def _append(self, op: dict):
+        with open(self._log_path(self._gen), "a", encoding="utf-8") as f:
+            f.write(json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    # ---- mutations ----
+
+    def _apply(self, op: dict):
+        key = op["key"]
+        self._remove(key)
+        if op["op"] == "add":
+            tf = op["tf"]
+            self._delta_docs[key] = (tf, sum(tf.values()))
+            for term, n in tf.items():
+                self._delta_postings.setdefault(term, {})[key] = n
+
+    def _remove(self, key: str):
+        old = self._delta_docs.pop(key, None)
+        if old is not None:
+            for term in old[0]:
+                postings = self._delta_postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._delta_postings[term]
+        pos = self._base_pos.get(key)
+        if pos is not None and not self._dead[pos]:
+            self._dead[pos] = True
+            self._base_len_live -= int(self._doc_len[pos])
+
+    def add(self, key: str, term_freqs: Dict[str, int]):
+        """Index (or re-index) a document from its term frequencies."""
+        op = {"op": "add", "key": key, "tf": {t: int(n) for t, n in term_freqs.items() if n > 0}}
+        with self._lock, self._file_lock():
+            self._sync()
+            self._append(op)
+            self._sync()
+            if len(self._delta_docs) + int(self._dead.sum()) >= self.compact_threshold:
+                self._compact_locked()
+
+    def delete(self, key: str) -> bool:
+        with self._lock, self._file_lock():
+            self._sync()
+            if not self._contains(key):
+                return False
+            self._append({"op": "del", "key": key})
+            self._sync()
+            return True
+
+    def _contains(self, key: str) -> bool:
+        if key in self._delta_docs:
+            return True
+        pos = self._base_pos.get(key)
+        return pos is not None and not self._dead[pos]
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            self._sync()
+            return self._contains(key)
+
+    def compact(self):
+        with self._lock, self._file_lock():
+            self._sync()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """Merge live base docs and the delta into generation gen+1."""
+        live = [i for i in range(len(self._base_keys)) if not self._dead[i]]
+        remap = np.full(len(self._base_keys), -1, dtype=np.int64)
+        remap[live] = np.arange(len(live))
+        keys = [self._base_keys[i] for i in live]
+        lengths = [int(self._doc_len[i]) for i in live]
+        delta_no = {}
+        for key, (_, length) in self._delta_docs.items():
+            delta_no[key] = len(keys)
+            keys.append(key)
+            lengths.append(length)
+
+        terms, docs_parts, tf_parts, offset = {}, [], [], 0
+        for term in sorted(set(self._terms) | set(self._delta_postings)):
+            d_parts, t_parts = [], []
+            if term in self._terms:
+                off, n = self._terms[term]
+                old_docs = np.asarray(self._post_docs[off:off + n])
+                new_docs = remap[old_docs]
+                keep = new_docs >= 0
+                d_parts.append(new_docs[keep])
+                t_parts.append(np.asarray(self._post_tf[off:off + n])[keep])
+            delta = self._delta_postings.get(term)
+            if delta:
+                d_parts.append(np.array([delta_no[k] for k in delta], dtype=np.int64))
+                t_parts.append(np.array(list(delta.values()), dtype=np.float32))
+            d = np.concatenate(d_parts) if d_parts else np.zeros(0, dtype=np.int64)
+            if not len(d):
+                continue
+            terms[term] = [offset, int(len(d))]
+            offset += len(d)
+            docs_parts.append(d)
+            tf_parts.append(np.concatenate(t_parts))
+
+        gen = self._gen + 1
+        seg = os.path.join(self.root, f"seg-{gen}")
+        shutil.rmtree(seg, ignore_errors=True)
+        os.makedirs(seg)
+        with open(os.path.join(seg, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False, separators=(",", ":"))
+        with open(os.path.join(seg, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump(keys, f, ensure_ascii=False)
+        np.save(os.path.join(seg, "doc_len.npy"), np.array(lengths, dtype=np.int32))
+        np.save(os.path.join(seg, "post_docs.npy"),
+                np.concatenate(docs_parts).astype(np.int32) if docs_parts else np.zeros(0, dtype=np.int32))
+        np.save(os.path.join(seg, "post_tf.npy"),
+                np.concatenate(tf_parts).astype(np.float32) if tf_parts else np.zeros(0, dtype=np.float32))
+        open(self._log_path(gen), "a").close()
+
+        tmp = os.path.join(self.root, "CURRENT.tmp")
+        with open(tmp, "w") as f:
+            f.write(str(gen))
+        os.replace(tmp, os.path.join(self.root, "CURRENT"))
+        old = self._gen
+        self._load_base(gen)
+        shutil.rmtree(os.path.join(self.root, f"seg-{old}"), ignore_errors=True)
+        try:
+            os.remove(self._log_path(old))
+        except OSError:
+            pass
+
+    # ---- queries ----
+
+    def search(self, query_tokens: List[str], top_k: int = 10) -> List[Tuple[str, float]]:
+        """BM25-ranked (key, score) pairs, best first."""
+        with self._lock:
+            self._sync()
+            n_base = len(self._base_keys)
+            n_docs = n_base - int(self._dead.sum()) + len(self._delta_docs)
+            if n_docs <= 0 or top_k <= 0:
+                return []
+            total_len = self._base_len_live + sum(length for _, length in self._delta_docs.values())
+            avgdl = max(1e-9, total_len / n_docs)
+            k1, b = self.k1, self.b
+
+            base_scores = np.zeros(n_base, dtype=np.float64)
+            delta_scores = {}
+            base_norm = None
+            for term in set(query_tokens):
+                span = self._terms.get(term)
+                delta = self._delta_postings.get(term)
+                if span is None and not delta:
+                    continue
+                if span is not None:
+                    off, n = span
+                    docs = np.asarray(self._post_docs[off:off + n])
+                    tfs = np.asarray(self._post_tf[off:off + n], dtype=np.float64)
+                    alive = ~self._dead[docs]
+                    docs, tfs = docs[alive], tfs[alive]
+                else:
+                    docs, tfs = None, None
+                df = (len(docs) if docs is not None else 0) + (len(delta) if delta else 0)
+                if df == 0:
+                    continue
+                idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+                if docs is not None and len(docs):
+                    if base_norm is None:
+                        base_norm = k1 * (1.0 - b + b * np.asarray(self._doc_len, dtype=np.float64) / avgdl)
+                    base_scores[docs] += idf * tfs * (k1 + 1.0) / (tfs + base_norm[docs])
+                if delta:
+                    for key, tf in delta.items():
+                        dl = self._delta_docs[key][1]
+                        s = idf * tf * (k1 + 1.0) / (tf + k1 * (1.0 - b + b * dl / avgdl))
+                        delta_scores[key] = delta_scores.get(key, 0.0) + s
+
+            hits = []
+            nz = np.flatnonzero(base_scores > 0)
+            if len(nz):
+                k = min(top_k, len(nz))
+                best = nz[np.argpartition(-base_scores[nz], k - 1)[:k]]
+                hits = [(self._base_keys[i], float(base_scores[i])) for i in best]
+            hits.extend(delta_scores.items())
+            hits.sort(key=lambda h: h[1], reverse=True)
+            return [(k, round(s, 4)) for k, s in hits[:top_k]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._sync()
+            dead = int(self._dead.sum())
+            return {
+                "generation": self._gen,
+                "documents": len(self._base_keys) - dead + len(self._delta_docs),
+                "base_documents": len(self._base_keys) - dead,
+                "delta_documents": len(self._delta_docs),
+                "deleted_pending": dead,
+                "terms": len(self._terms),
+            }
@@ -3,60 +3,355 @@
 semantic.py
 Provides semantic matching functions using sentence-transformers when available,
 and a robust lexical fallback when not.
+Embeddings are cached on disk per (model name, text hash) in a memory-mapped
+float32 matrix, so only texts never seen before are sent to the model.
+sentence_transformers (and torch) are imported only when a model is first needed.
+When an embedding sidecar is running (see embed_sidecar.py), texts are encoded there
+and this process never loads the model; if it is absent, encoding happens in-process.
 """
-import os, re
-from typing import List, Tuple
+import os, re, json, math, hashlib, threading, time, logging, importlib.util
+from functools import lru_cache
+from typing import List, Tuple, Optional
+from . import embed_sidecar
+from .filelock import dir_lock
+
+log = logging.getLogger(__name__)
 
-_has_transformers = False
 try:
-    from sentence_transformers import SentenceTransformer, util
-    _has_transformers = True
+    import numpy as np
 except Exception:
-    _has_transformers = False
+    np = None
+
+# availability check only; the actual import is deferred to _load_model()
+_has_transformers = np is not None and importlib.util.find_spec("sentence_transformers") is not None
+
+MODEL_NAME = os.getenv("LOCAL_EMBED_MODEL", "all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(os.getenv("CACHE_DIR", "cache"), "embeddings"))
 
 _MODEL = None
+_MODEL_LOCK = threading.Lock()
+_MODEL_TIMINGS = {}
+_MODEL_ERROR = None
+
 def _load_model():
-    global _MODEL
-    if _MODEL is None and _has_transformers:
-        _MODEL = SentenceTransformer(os.getenv("LOCAL_EMBED_MODEL", "all-MiniLM-L6-v2"))
+    global _MODEL, _MODEL_ERROR
+    if _MODEL is not None or not _has_transformers or _MODEL_ERROR is not None:
+        return _MODEL
+    with _MODEL_LOCK:
+        if _MODEL is not None or _MODEL_ERROR is not None:
+            return _MODEL
+        try:
+            t0 = time.perf_counter()
+            from sentence_transformers import SentenceTransformer
+            t1 = time.perf_counter()
+            model = SentenceTransformer(MODEL_NAME)
+            t2 = time.perf_counter()
+        except Exception as e:
+            _MODEL_ERROR = str(e)
+            log.warning("semantic: could not load %s, using lexical fallback: %s", MODEL_NAME, e)
+            return None
+        _MODEL_TIMINGS.update({"import_seconds": round(t1 - t0, 3), "load_seconds": round(t2 - t1, 3)})
+        log.info("semantic: imported sentence_transformers in %.3fs, loaded %s in %.3fs",
+                 t1 - t0, MODEL_NAME, t2 - t1)
+        _MODEL = model
     return _MODEL
 
-def embed_texts(texts: List[str]):
+def model_available() -> bool:
+    """True if texts can be embedded, by the sidecar or by a model loaded in-process."""
+    return _has_transformers or embed_sidecar.available()
+
+def warm_up() -> bool:
+    """Load the model (and run one tiny encode) ahead of the first request; a no-op when the sidecar answers."""
+    if embed_sidecar.status() is not None:
+        return True
+    model = _load_model()
+    if model is None:
+        return False
+    t0 = time.perf_counter()
+    model.encode(["warm up"], convert_to_numpy=True)
+    _MODEL_TIMINGS["warmup_encode_seconds"] = round(time.perf_counter() - t0, 3)
+    return True
+
+def model_status() -> dict:
+    return {
+        "model": MODEL_NAME,
+        "available": _has_transformers,
+        "loaded": _MODEL is not None,
+        "sidecar": embed_sidecar.SOCKET_PATH if embed_sidecar.available() else None,
+        "error": _MODEL_ERROR,
+        "timings": dict(_MODEL_TIMINGS),
+    }
+
+def text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
     """
-    Returns list of numpy-like vectors if model available, else None.
+    Append-only on-disk store: <root>/vectors.f32 holds one L2-normalised row per text,
+    <root>/keys.txt the matching text hashes (one per line, same order), meta.json the dim.
+    Vectors are written before their keys, so a visible key always has its row.
+    Nothing is ever evicted, so it only receives texts that recur across requests
+    (job descriptions, skill names), never per-resume chunks; see embed_texts().
     """
-    model = _load_model()
-    if not model:
+    def __init__(self, root: str):
+        self.root = root
+        self._vec_path = os.path.join(root, "vectors.f32")
+        self._keys_path = os.path.join(root, "keys.txt")
+        self._meta_path = os.path.join(root, "meta.json")
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._keys_offset = 0
+        self._dim = None
+        self._mmap = None
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self):
+        """Pick up rows appended since the last sync (possibly by another process)."""
+        if self._dim is None:
+            if not os.path.exists(self._meta_path):
+                return
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self._dim = int(json.load(f)["dim"])
+        if not os.path.exists(self._keys_path):
+            return
+        with open(self._keys_path, "r", encoding="utf-8") as f:
+            f.seek(self._keys_offset)
+            tail = f.read()
+        lines = tail.split("\n")
+        complete = lines[:-1]  # last element is "" or a line still being written
+        for key in complete:
+            self._rows.setdefault(key, len(self._rows))
+        self._keys_offset += sum(len(k) + 1 for k in complete)
+
+    def _matrix(self):
+        n = len(self._rows)
+        if n == 0:
+            return None
+        if self._mmap is None or self._mmap.shape[0] < n:
+            self._mmap = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(n, self._dim))
+        return self._mmap
+
+    def lookup(self, keys: List[str]) -> Tuple[dict, List[str]]:
+        """Returns ({key: vector} for cached keys, [missing keys])."""
+        with self._lock:
+            if any(k not in self._rows for k in keys):
+                self._sync()
+            found, missing = {}, []
+            mat = self._matrix()
+            for k in keys:
+                row = self._rows.get(k)
+                if row is None:
+                    missing.append(k)
+                else:
+                    found[k] = np.array(mat[row])
+            self.hits += len(found)
+            self.misses += len(missing)
+            return found, missing
+
+    def add(self, keys: List[str], vectors):
+        if not keys:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock, dir_lock(self.root):
+            if self._dim is None and not os.path.exists(self._meta_path):
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": int(vectors.shape[1])}, f)
+            self._sync()
+            keep = [i for i, k in enumerate(keys) if k not in self._rows]
+            if not keep:
+                return
+            with open(self._vec_path, "ab") as f:
+                f.write(vectors[keep].tobytes())
+            with open(self._keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(keys[i] + "\n" for i in keep))
+            self._sync()
+
+    def stats(self) -> dict:
+        return {"rows": len(self._rows), "dim": self._dim, "hits": self.hits, "misses": self.misses}
+
+_STORE = None
+def get_embedding_store() -> EmbeddingStore:
+    global _STORE
+    if _STORE is None:
+        safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", MODEL_NAME)
+        _STORE = EmbeddingStore(os.path.join(EMBED_CACHE_DIR, safe))
+    return _STORE
+
+def embed_texts(texts: List[str], batch_size: Optional[int] = None, persist_from: int = 0):
+    """
+    Returns an (n, dim) float32 numpy array of L2-normalised vectors if a model is
+    available, else None. Cached texts are read from the embedding store; the rest
+    are encoded in one batched call (by the sidecar when it runs) and added to it.
+    Only texts[persist_from:] go through the store: earlier ones are one-off text
+    (a resume's chunks or body) that would only grow it, so they are always encoded.
+    """
+    if not model_available():
         return None
-    return model.encode(texts, convert_to_tensor=True)
+    store = get_embedding_store()
+    keys = [text_key(t) for t in texts]
+    found, missing = store.lookup(keys[persist_from:])
+    missing_set = set(missing) | set(keys[:persist_from])
+    if missing_set:
+        todo = {}
+        for k, t in zip(keys, texts):
+            if k in missing_set and k not in todo:
+                todo[k] = t
+        new_keys = list(todo)
+        new_texts = [todo[k] for k in new_keys]
+        vecs = embed_sidecar.encode(new_texts, MODEL_NAME)
+        if vecs is None:
+            model = _load_model()
+            if not model:
+                return None
+            vecs = model.encode(
+                new_texts,
+                batch_size=batch_size or EMBED_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+        persisted = set(missing)
+        keep = [i for i, k in enumerate(new_keys) if k in persisted]
+        store.add([new_keys[i] for i in keep], np.asarray(vecs)[keep])
+        for k, v in zip(new_keys, vecs):
+            found[k] = np.asarray(v, dtype=np.float32)
+    return np.stack([found[k] for k in keys]) if keys else None
 
-def semantic_matches(doc_text: str, candidates: List[str], top_k: int = 10) -> List[Tuple[str, float]]:
+def top_k_indices(scores, k: int):
     """
-    If sentence-transformers available, returns candidates ranked by cosine similarity.
-    Otherwise falls back to lexical fuzzy scoring (simple).
-    Returns list of (candidate, score 0..100)
+    Indices of the k largest scores, best first, ties broken by index. argpartition
+    finds the k-th largest score; only the scores at or above it are sorted.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        idx = np.flatnonzero(scores >= kth)
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.lexsort((idx, -scores[idx]))[:k]]
+
+HASH_VECTOR_DIM = int(os.getenv("HASH_VECTOR_DIM", 512))
+
+def hashed_vectors(texts: List[str], dim: int = HASH_VECTOR_DIM):
+    """
+    Lexical fallback embedding: signed feature hashing of lowercase word tokens,
+    log-scaled counts, L2-normalised. Deterministic across processes and runs.
+    """
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        counts = {}
+        for tok in re.findall(r"\w+", (text or "").lower()):
+            counts[tok] = counts.get(tok, 0) + 1
+        for tok, n in counts.items():
+            h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+            out[row, h % dim] += (1.0 if (h >> 63) & 1 else -1.0) * (1.0 + math.log(n))
+        norm = np.linalg.norm(out[row])
+        if norm > 0:
+            out[row] /= norm
+    return out
+
+def document_vectors(texts: List[str], persist: bool = True) -> Tuple[str, "np.ndarray"]:
+    """
+    (vector space name, (n, dim) normalised vectors). Uses the embedding model when it
+    can be loaded, hashed lexical vectors otherwise; vectors from different spaces
+    must never be compared, hence the name. persist=False keeps model vectors out of
+    the embedding store (for texts whose vectors are kept elsewhere, like resumes).
+    """
+    if model_available():
+        embs = embed_texts(texts, persist_from=0 if persist else len(texts))
+        if embs is not None:
+            return "model:" + MODEL_NAME, embs
+    return f"hashed:{HASH_VECTOR_DIM}", hashed_vectors(texts)
+
+CHUNK_MIN_CHARS = int(os.getenv("SEMANTIC_CHUNK_MIN_CHARS", 40))
+CHUNK_MAX_CHARS = int(os.getenv("SEMANTIC_CHUNK_MAX_CHARS", 400))
+MAX_CHUNKS = int(os.getenv("SEMANTIC_MAX_CHUNKS", 256))
+
+_SPLIT = re.compile(r"\n\s*|(?<=[.!?])\s+")
+_TOKEN = re.compile(r"\w+")
+
+def split_chunks(text: str, min_chars: int = CHUNK_MIN_CHARS, max_chars: int = CHUNK_MAX_CHARS,
+                 max_chunks: int = MAX_CHUNKS) -> List[str]:
+    """
+    Sentences/lines of `text`, short fragments (headings, bullet stubs) merged into the
+    next piece and long ones cut at word boundaries, so every chunk fits the model window.
+    """
+    chunks, pending = [], ""
+    for piece in _SPLIT.split(text or ""):
+        piece = piece.strip()
+        if not piece:
+            continue
+        pending = f"{pending} {piece}" if pending else piece
+        if len(pending) < min_chars:
+            continue
+        while len(pending) > max_chars:
+            cut = pending.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            chunks.append(pending[:cut].strip())
+            pending = pending[cut:].strip()
+        if pending:
+            chunks.append(pending)
+        pending = ""
+        if len(chunks) >= max_chunks:
+            return chunks[:max_chunks]
+    if pending:
+        chunks.append(pending)
+    return chunks[:max_chunks]
+
+@lru_cache(maxsize=4096)
+def _candidate_tokens(candidate: str) -> frozenset:
+    return frozenset(_TOKEN.findall(candidate.lower()))
+
+def semantic_evidence(doc_text: str, candidates: List[str], top_k: int = 10) -> List[dict]:
+    """
+    Candidates ranked by how well the resume supports them, each with the chunk that
+    matched best: [{"skill", "score" 0..100, "evidence"}]. With a model, the resume is
+    split into chunks that are encoded in one batch together with the candidates; a
+    skill's score is its best cosine similarity over all chunks (one matrix multiply,
+    max-pooled). Without one, the lexical fallback scores token overlap with the whole
+    document (tokenized once) and picks the chunk sharing the most tokens as evidence.
     """
     if not doc_text or not candidates:
         return []
+    candidates = list(candidates)
+    chunks = split_chunks(doc_text) or [doc_text[:CHUNK_MAX_CHARS]]
 
-    if _has_transformers:
+    if model_available():
         try:
-            doc_emb = embed_texts([doc_text])[0]
-            cand_embs = embed_texts(candidates)
-            sims = util.cos_sim(doc_emb, cand_embs)[0].tolist()
-            out = [(candidates[i], float(sims[i])) for i in range(len(candidates))]
-            out.sort(key=lambda x: x[1], reverse=True)
-            return [(t[0], int(round(t[1]*100))) for t in out[:top_k]]
+            # chunk vectors are specific to this resume; only the candidates' are worth storing
+            embs = embed_texts(chunks + candidates, persist_from=len(chunks))
+            if embs is not None:
+                sims = embs[len(chunks):] @ embs[:len(chunks)].T   # (candidates, chunks)
+                best = sims.argmax(axis=1)
+                scores = sims[np.arange(len(candidates)), best]
+                return [{"skill": candidates[i], "score": int(round(float(scores[i]) * 100)),
+                         "evidence": chunks[best[i]]} for i in top_k_indices(scores, top_k)]
         except Exception:
             pass
 
-    doc_tokens = set(re.findall(r"\w+", doc_text.lower()))
-    out = []
-    for c in candidates:
-        c_tokens = set(re.findall(r"\w+", c.lower()))
+    doc_tokens = set(_TOKEN.findall(doc_text.lower()))
+    chunk_tokens = [set(_TOKEN.findall(c.lower())) for c in chunks]
+    scores = np.zeros(len(candidates), dtype=np.int64)
+    evidence = [None] * len(candidates)
+    for i, c in enumerate(candidates):
+        c_tokens = _candidate_tokens(c)
         overlap = len(doc_tokens & c_tokens)
-        total = max(1, len(c_tokens))
-        score = int(round(100.0 * overlap / total))
-        out.append((c, score))
-    out.sort(key=lambda x: x[1], reverse=True)
-    return out[:top_k]
+        scores[i] = int(round(100.0 * overlap / max(1, len(c_tokens))))
+        if overlap:
+            j = max(range(len(chunks)), key=lambda j: len(chunk_tokens[j] & c_tokens))
+            evidence[i] = chunks[j]
+    return [{"skill": candidates[i], "score": int(scores[i]), "evidence": evidence[i]}
+            for i in top_k_indices(scores, top_k)]
+
+def semantic_matches(doc_text: str, candidates: List[str], top_k: int = 10) -> List[Tuple[str, float]]:
+    """
+    If sentence-transformers available, returns candidates ranked by their best cosine
+    similarity to any chunk of the resume; otherwise by lexical token overlap.
+    Returns list of (candidate, score 0..100); see semantic_evidence for the matching chunks.
+    """
+    return [(m["skill"], m["score"]) for m in semantic_evidence(doc_text, candidates, top_k)]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+skill_matcher.py - single-pass multi-pattern skill matching (Aho-Corasick)
+The automaton is compiled once per taxonomy version (taxonomy.py owns it) and finds
+every dictionary term in one scan over the text, case-insensitively and on word boundaries.
+A scan costs the same with 50 terms or 5000; a regex alternation tries every term at
+every position and slows down linearly with the dictionary.
+"""
+from typing import List, Tuple, Iterable
+
+# characters that glue onto a term, so "c" does not match inside "c++" or "c#"
+_TRAILING_GLUE = "+#"
+
+def _lower(ch: str) -> str:
+    lo = ch.lower()
+    return lo if len(lo) == 1 else ch
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class SkillMatcher:
+    def __init__(self, terms: Iterable[str]):
+        self.terms = tuple(dict.fromkeys(terms))
+        goto = [{}]
+        out = [[]]
+        for idx, term in enumerate(self.terms):
+            node = 0
+            for ch in term.lower():
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                node = nxt
+            out[node].append((idx, len(term)))
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                cand = goto[f].get(ch, 0)
+                fail[nxt] = cand if cand != nxt else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def find_all(self, text: str) -> List[Tuple[str, int, int]]:
+        """Every (term, start, end) hit in `text`; offsets index into the original string."""
+        if not text:
+            return []
+        goto, fail, out = self._goto, self._fail, self._out
+        n = len(text)
+        hits = []
+        node = 0
+        for i, ch in enumerate(text):
+            ch = _lower(ch)
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            for idx, length in out[node]:
+                start = i - length + 1
+                term = self.terms[idx]
+                if start > 0 and _is_word(text[start - 1]) and _is_word(term[0]):
+                    continue
+                if i + 1 < n:
+                    nxt = text[i + 1]
+                    if (_is_word(nxt) and _is_word(term[-1])) or nxt in _TRAILING_GLUE:
+                        continue
+                hits.append((term, start, i + 1))
+        hits.sort(key=lambda h: (h[1], h[2]))
+        return hits
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+taxonomy.py - the one skill dictionary shared by main.py, analyzer.py and suggestion grouping
+skills_taxonomy.json lists every skill with its kind (tech/soft), suggestion category,
+weight and aliases. It is compiled once into an immutable Taxonomy (one Aho-Corasick
+automaton over names and aliases); the version id is a hash of the file's content.
+current() re-checks the file's mtime at most every TAXONOMY_CHECK_SECONDS and swaps a
+new compilation in atomically, so edits reach the API and every worker process without
+a restart. A file that fails to load leaves the previous version in place.
+"""
+import os, json, time, hashlib, threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from .skill_matcher import SkillMatcher
+
+TAXONOMY_PATH = os.getenv("SKILL_TAXONOMY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills_taxonomy.json"))
+CHECK_SECONDS = float(os.getenv("TAXONOMY_CHECK_SECONDS", 2.0))
+
+KINDS = ("tech", "soft")
+
+class Skill(NamedTuple):
+    name: str
+    kind: str
+    category: str
+    weight: float
+    aliases: Tuple[str, ...]
+
+class Taxonomy:
+    def __init__(self, data: dict):
+        skills = {}
+        for raw in data["skills"]:
+            name = raw["name"].lower()
+            kind = raw.get("kind", "tech")
+            if kind not in KINDS:
+                raise ValueError(f"skill {name!r}: kind must be one of {KINDS}")
+            skills[name] = Skill(name, kind, raw.get("category", "general"), float(raw.get("weight", 1.0)),
+                                 tuple(a.lower() for a in raw.get("aliases", ())))
+        self.skills: Dict[str, Skill] = skills
+        self.tech = tuple(s.name for s in skills.values() if s.kind == "tech")
+        self.soft = tuple(s.name for s in skills.values() if s.kind == "soft")
+        self._canonical = {}
+        for s in skills.values():
+            for form in (s.name,) + s.aliases:
+                self._canonical.setdefault(form, s.name)
+        self._matcher = SkillMatcher(self._canonical)
+        canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        self.version = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+    def find(self, text: str, kind: Optional[str] = None) -> List[str]:
+        """Sorted canonical names of the skills (optionally of one kind) mentioned in `text`."""
+        found = {self._canonical[h[0]] for h in self._matcher.find_all(text or "")}
+        if kind is not None:
+            found = {n for n in found if self.skills[n].kind == kind}
+        return sorted(found)
+
+    def find_by_kind(self, text: str) -> Tuple[List[str], List[str]]:
+        """(tech, soft) skills in `text` from a single scan."""
+        found = self.find(text)
+        return ([n for n in found if self.skills[n].kind == "tech"],
+                [n for n in found if self.skills[n].kind == "soft"])
+
+    def weight(self, name: str) -> float:
+        s = self.skills.get(name)
+        return s.weight if s else 1.0
+
+    def category(self, name: str) -> str:
+        s = self.skills.get(name.lower())
+        return s.category if s else "general"
+
+_lock = threading.Lock()
+_current: Optional[Taxonomy] = None
+_mtime = None
+_checked = 0.0
+
+def load(path: str = TAXONOMY_PATH) -> Taxonomy:
+    with open(path, "r", encoding="utf-8") as f:
+        return Taxonomy(json.load(f))
+
+def current() -> Taxonomy:
+    """The live taxonomy, reloaded when the file changes."""
+    global _current, _mtime, _checked
+    now = time.monotonic()
+    if _current is not None and now - _checked < CHECK_SECONDS:
+        return _current
+    with _lock:
+        if _current is not None and now - _checked < CHECK_SECONDS:
+            return _current
+        _checked = now
+        try:
+            mtime = os.path.getmtime(TAXONOMY_PATH)
+        except OSError:
+            mtime = None
+        if _current is None or (mtime is not None and mtime != _mtime):
+            try:
+                compiled = load()
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                if _current is None:
+                    raise
+                print(f"skill taxonomy: keeping {_current.version}, reload failed: {e}")
+            else:
+                if _current is not None and compiled.version != _current.version:
+                    print(f"skill taxonomy: {_current.version} -> {compiled.version}")
+                _current = compiled
+            _mtime = mtime
+        return _current
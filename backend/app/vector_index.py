@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+vector_index.py - local approximate nearest neighbour index (pure NumPy IVF)
+Layout under <root>:
+  meta.json     {"space": vector space name, "dim": int}; vectors from other spaces are refused
+  vectors.f32   append-only float32 rows (L2-normalised), memory-mapped
+  keys.log      "+<row>\\t<key>" / "-<key>" lines, replayed on load and by other processes
+  ivf.npz       k-means centroids (the coarse quantizer) and the row count they were trained on
+  epoch         bumped by reset(), so other processes drop their cached space and log offset
+A query scores only the rows in the n_probe inverted lists closest to it, so
+n_probe trades recall for latency; exact=True scores every live row (brute force)
+and recall() compares the two.
+"""
+import os, json, threading
+from typing import List, Tuple, Optional
+import numpy as np
+from .filelock import dir_lock
+
+class SpaceMismatch(ValueError):
+    pass
+
+class VectorIndex:
+    def __init__(self, root: str, n_probe: int = 8, min_train: int = 256, kmeans_iters: int = 10):
+        if n_probe < 1:
+            raise ValueError(f"n_probe must be at least 1, got {n_probe}")
+        self.root = root
+        self.n_probe = n_probe
+        self.min_train = min_train
+        self.kmeans_iters = kmeans_iters
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        self._meta_path = os.path.join(root, "meta.json")
+        self._vec_path = os.path.join(root, "vectors.f32")
+        self._log_path = os.path.join(root, "keys.log")
+        self._ivf_path = os.path.join(root, "ivf.npz")
+        self._epoch_path = os.path.join(root, "epoch")
+        self._epoch = 0
+        self._reset_state()
+        with self._lock:
+            self._sync()
+
+    def _reset_state(self):
+        self.space, self.dim = None, None
+        self._rows = {}                  # key -> live row
+        self._keys = []                  # row -> key
+        self._alive = np.zeros(0, dtype=bool)
+        self._mmap = None
+        self._log_offset = 0
+        self._centroids = None
+        self._trained_on = 0
+        self._ivf_mtime = None
+        self._assign = np.zeros(0, dtype=np.int32)  # row -> list id, -1 = not assigned yet
+        self._order = None               # rows sorted by list id (rebuilt lazily)
+        self._bounds = None
+
+    def _file_lock(self):
+        return dir_lock(self.root)
+
+    # ---- sync with disk (this or other processes) ----
+
+    def _read_epoch(self) -> int:
+        try:
+            with open(self._epoch_path, "r") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _sync(self):
+        epoch = self._read_epoch()
+        if epoch != self._epoch:  # reset() ran in another process: everything cached is stale
+            self._reset_state()
+            self._epoch = epoch
+        if self.space is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.space, self.dim = meta["space"], int(meta["dim"])
+        if os.path.exists(self._log_path) and os.path.getsize(self._log_path) > self._log_offset:
+            with open(self._log_path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read()
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].decode("utf-8").splitlines():
+                if line.startswith("+"):
+                    row, key = line[1:].split("\t", 1)
+                    self._apply_add(key, int(row))
+                elif line.startswith("-"):
+                    self._apply_delete(line[1:])
+            self._log_offset += end
+        if os.path.exists(self._ivf_path):
+            mtime = os.path.getmtime(self._ivf_path)
+            if mtime != self._ivf_mtime:
+                with np.load(self._ivf_path) as z:
+                    self._centroids = z["centroids"].astype(np.float32)
+                    self._trained_on = int(z["trained_on"])
+                self._ivf_mtime = mtime
+                self._assign[:] = -1
+                self._order = None
+
+    def _grow(self, n: int):
+        if n > len(self._alive):
+            cap = max(n, 2 * len(self._alive), 1024)
+            self._alive = np.concatenate([self._alive, np.zeros(cap - len(self._alive), dtype=bool)])
+            self._assign = np.concatenate([self._assign, np.full(cap - len(self._assign), -1, dtype=np.int32)])
+        while len(self._keys) < n:
+            self._keys.append(None)
+
+    def _apply_add(self, key: str, row: int):
+        self._apply_delete(key)
+        self._grow(row + 1)
+        self._rows[key] = row
+        self._keys[row] = key
+        self._alive[row] = True
+        self._assign[row] = -1
+        self._order = None
+
+    def _apply_delete(self, key: str):
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._alive[row] = False
+
+    def _vectors(self):
+        n = len(self._keys)
+        if n == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self._mmap is None or self._mmap.shape[0] < n:
+            self._mmap = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        return self._mmap
+
+    # ---- mutations ----
+
+    def reset(self):
+        """Drop everything, e.g. when the vector space changes (model installed or removed)."""
+        with self._lock, self._file_lock():
+            epoch = self._read_epoch() + 1
+            for path in (self._meta_path, self._vec_path, self._log_path, self._ivf_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            tmp = self._epoch_path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(str(epoch))
+            os.replace(tmp, self._epoch_path)
+            self._reset_state()
+            self._epoch = epoch
+
+    def add(self, key: str, vector, space: str):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock, self._file_lock():
+            self._sync()
+            if self.space is None:
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"space": space, "dim": int(vector.shape[0])}, f)
+                self.space, self.dim = space, int(vector.shape[0])
+            if space != self.space or vector.shape[0] != self.dim:
+                raise SpaceMismatch(f"index holds {self.space} vectors, got {space}")
+            row = os.path.getsize(self._vec_path) // (4 * self.dim) if os.path.exists(self._vec_path) else 0
+            with open(self._vec_path, "ab") as f:
+                f.write(vector.tobytes())
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                f.write(f"+{row}\t{key}\n")
+            self._sync()
+            live = len(self._rows)
+            if (self._centroids is None and live >= self.min_train) or \
+                    (self._centroids is not None and live >= 2 * self._trained_on):
+                self._train_locked()
+
+    def delete(self, key: str) -> bool:
+        with self._lock, self._file_lock():
+            self._sync()
+            if key not in self._rows:
+                return False
+            with open(self._log_path, "a", encoding="utf-8") as f:
+                f.write(f"-{key}\n")
+            self._sync()
+            return True
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            self._sync()
+            return key in self._rows
+
+    # ---- IVF ----
+
+    def train(self):
+        with self._lock, self._file_lock():
+            self._sync()
+            self._train_locked()
+
+    def _train_locked(self):
+        live = np.flatnonzero(self._alive[:len(self._keys)])
+        if len(live) == 0:
+            return
+        vecs = self._vectors()
+        nlist = int(min(4096, max(1, round(np.sqrt(len(live))))))
+        rng = np.random.default_rng(0)
+        sample = live if len(live) <= 50 * nlist else rng.choice(live, 50 * nlist, replace=False)
+        data = np.asarray(vecs[np.sort(sample)])
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):  # spherical k-means: vectors are unit length
+            labels = np.argmax(data @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = data[labels == c]
+                if len(members):
+                    v = members.sum(axis=0)
+                    centroids[c] = v / max(1e-12, np.linalg.norm(v))
+        tmp = self._ivf_path + ".tmp.npz"
+        np.savez(tmp, centroids=centroids, trained_on=len(live))
+        os.replace(tmp, self._ivf_path)
+        self._sync()
+
+    def _ensure_lists(self):
+        if self._centroids is None:
+            return
+        n = len(self._keys)
+        todo = np.flatnonzero(self._assign[:n] < 0)
+        if len(todo):
+            vecs = self._vectors()
+            for start in range(0, len(todo), 8192):
+                rows = todo[start:start + 8192]
+                self._assign[rows] = np.argmax(np.asarray(vecs[rows]) @ self._centroids.T, axis=1)
+            self._order = None
+        if self._order is None:
+            assign = self._assign[:n]
+            self._order = np.argsort(assign, kind="stable").astype(np.int64)
+            self._bounds = np.searchsorted(assign[self._order], np.arange(len(self._centroids) + 1))
+
+    # ---- queries ----
+
+    def search(self, query, top_k: int = 10, n_probe: Optional[int] = None,
+               exact: bool = False, space: Optional[str] = None) -> List[Tuple[str, float]]:
+        """(key, cosine similarity) pairs, best first. With `space`, raises SpaceMismatch unless the index holds it."""
+        if n_probe is not None and n_probe < 1:
+            raise ValueError(f"n_probe must be at least 1, got {n_probe}")
+        query = np.asarray(query, dtype=np.float32).ravel()
+        with self._lock:
+            self._sync()
+            if space is not None and self.space is not None and space != self.space:
+                raise SpaceMismatch(f"index holds {self.space} vectors, got {space}")
+            n = len(self._keys)
+            if n == 0 or top_k <= 0:
+                return []
+            vecs = self._vectors()
+            if exact or self._centroids is None:
+                rows = np.flatnonzero(self._alive[:n])
+            else:
+                self._ensure_lists()
+                probe = min(len(self._centroids), n_probe if n_probe is not None else self.n_probe)
+                lists = np.argpartition(-(self._centroids @ query), probe - 1)[:probe]
+                rows = np.concatenate([self._order[self._bounds[c]:self._bounds[c + 1]] for c in lists])
+                rows = np.sort(rows[self._alive[rows]])
+            if len(rows) == 0:
+                return []
+            scores = np.asarray(vecs[rows]) @ query
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [(self._keys[rows[i]], round(float(scores[i]), 4)) for i in best]
+
+    def recall(self, queries, top_k: int = 10, n_probe: Optional[int] = None, space: Optional[str] = None) -> float:
+        """Mean overlap of approximate vs brute-force top-k over the given query vectors."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        total = 0.0
+        for q in queries:
+            truth = {k for k, _ in self.search(q, top_k, exact=True, space=space)}
+            approx = {k for k, _ in self.search(q, top_k, n_probe=n_probe, space=space)}
+            total += len(truth & approx) / max(1, len(truth))
+        return round(total / max(1, len(queries)), 4)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._sync()
+            return {
+                "space": self.space,
+                "dim": self.dim,
+                "vectors": len(self._rows),
+                "rows_on_disk": len(self._keys),
+                "lists": 0 if self._centroids is None else len(self._centroids),
+                "trained_on": self._trained_on,
+                "n_probe": self.n_probe,
+            }
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+workers.py - bounded process pool for CPU-bound work (PDF parsing, scoring)
+Keeps PyPDF2 and tokenization off the asyncio event loop. At most
+max_workers tasks run at once and at most max_queue more may wait; beyond that
+run() raises PoolSaturated so the API can answer 503 instead of queueing forever.
+With metrics enabled, stage timings measured inside a worker travel back with the
+result and are recorded in the calling request.
+A worker that dies (OOM kill, segfault in a C extension) breaks the whole executor;
+the tasks in flight fail with BrokenProcessPool and the next call starts a new one.
+"""
+import asyncio, threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Any, List
+from . import metrics
+
+class PoolSaturated(Exception):
+    pass
+
+class AnalysisPool:
+    def __init__(self, max_workers: int, max_queue: int):
+        # max_workers=0 runs tasks on the event loop's default thread pool (useful for debugging)
+        self.max_workers = max(0, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    @property
+    def capacity(self) -> int:
+        return max(1, self.max_workers) + self.max_queue
+
+    def _get_executor(self):
+        if self.max_workers == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _discard(self, executor):
+        """Drop a broken executor (once, however many of its tasks report it)."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _reserve(self, n: int):
+        with self._lock:
+            if self._pending + n > self.capacity:
+                self.rejected += 1
+                raise PoolSaturated("analysis queue is full")
+            self._pending += n
+
+    def _release(self, ok: bool):
+        with self._lock:
+            self._pending -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    async def _submit(self, fn: Callable, args) -> Any:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        ok = False
+        try:
+            if metrics.ENABLED:
+                result, timings = await loop.run_in_executor(executor, metrics.timed_call, fn, *args)
+                metrics.record(timings)
+            else:
+                result = await loop.run_in_executor(executor, fn, *args)
+            ok = True
+            return result
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+        finally:
+            self._release(ok)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) in a worker process; raises PoolSaturated when the queue is full."""
+        self._reserve(1)
+        return await self._submit(fn, args)
+
+    async def run_many(self, fn: Callable, arg_list: List[tuple]) -> List[Any]:
+        """Run fn over every args tuple; all slots are reserved up front or none are."""
+        if not arg_list:
+            return []
+        self._reserve(len(arg_list))
+        return await asyncio.gather(*[self._submit(fn, args) for args in arg_list])
+
+    def stats(self) -> dict:
+        workers = max(1, self.max_workers)
+        pending = self._pending
+        running = min(pending, workers)
+        return {
+            "mode": "process" if self.max_workers else "thread",
+            "workers": self.max_workers,
+            "running": running,
+            "queued": pending - running,
+            "max_queue": self.max_queue,
+            "utilisation": round(running / workers, 3),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
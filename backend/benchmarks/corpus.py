@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+corpus.py - deterministic synthetic resumes (as real PDFs) and job descriptions
+Same seed -> byte-identical output, so benchmark runs are comparable.
+"""
+import random
+from typing import List
+
+SKILLS = [
+    "Python", "Java", "C++", "JavaScript", "TypeScript", "React", "Redux", "Next.js",
+    "Node.js", "Express", "FastAPI", "Django", "Flask", "HTML", "CSS", "Tailwind",
+    "MongoDB", "MySQL", "PostgreSQL", "SQL", "REST API", "GraphQL", "Git", "GitHub",
+    "Docker", "AWS", "Azure", "GCP", "machine learning", "deep learning", "Pandas",
+    "NumPy", "OpenCV", "Kubernetes", "Terraform", "Go", "Rust", "Kafka", "Redis",
+]
+SOFT = [
+    "communication", "teamwork", "leadership", "problem solving", "time management",
+    "adaptability", "critical thinking", "ownership", "stakeholder management",
+]
+VERBS = ["Built", "Designed", "Led", "Improved", "Reduced", "Migrated", "Automated", "Shipped", "Optimized"]
+NOUNS = ["service", "pipeline", "dashboard", "API", "platform", "feature", "workflow", "cluster", "model"]
+FILLER = ("the team customers product reliability latency throughput users data reports "
+          "release quality testing deployment monitoring onboarding costs revenue").split()
+
+def _bullet(rng: random.Random) -> str:
+    skill = rng.choice(SKILLS)
+    extra = " ".join(rng.choice(FILLER) for _ in range(rng.randint(3, 9)))
+    return "- {} a {} {} using {} and {}, {} by {}%.".format(
+        rng.choice(VERBS), rng.choice(NOUNS), extra, skill, rng.choice(SKILLS),
+        rng.choice(["improving", "cutting", "raising"]), rng.randint(5, 80))
+
+def resume_pages(seed: int, n_pages: int, lines_per_page: int = 48) -> List[List[str]]:
+    rng = random.Random(seed)
+    pages = []
+    for p in range(n_pages):
+        lines = []
+        if p == 0:
+            lines += ["Candidate {}".format(seed), "Software Engineer", "",
+                      "Skills: " + ", ".join(rng.sample(SKILLS, 10)),
+                      "Strengths: " + ", ".join(rng.sample(SOFT, 3)), "", "Experience"]
+        while len(lines) < lines_per_page:
+            lines.append(_bullet(rng))
+        pages.append(lines)
+    return pages
+
+def resume_text(seed: int, n_pages: int) -> str:
+    return "\n".join("\n".join(lines) for lines in resume_pages(seed, n_pages))
+
+def job_description(seed: int, n_words: int) -> str:
+    rng = random.Random(10_000 + seed)
+    words = []
+    while len(words) < n_words:
+        r = rng.random()
+        if r < 0.15:
+            words.extend(rng.choice(SKILLS).split())
+        elif r < 0.2:
+            words.extend(rng.choice(SOFT).split())
+        else:
+            words.append(rng.choice(FILLER))
+    return "We are hiring. " + " ".join(words[:n_words]) + "."
+
+def _escape(s: str) -> str:
+    s = s.encode("latin-1", "replace").decode("latin-1")
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(pages: List[List[str]]) -> bytes:
+    """Minimal PDF (Helvetica text, one content stream per page) that PyPDF2 can extract."""
+    objects = []  # index i -> object number i + 1
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(None)  # pages tree, filled in below
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for lines in pages:
+        body = "BT /F1 10 Tf 12 TL 50 790 Td " + " ".join("({}) Tj T*".format(_escape(l)) for l in lines) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_no = len(objects)
+        objects.append(("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                        "/Resources << /Font << /F1 3 0 R >> >> /Contents {} 0 R >>").format(content_no).encode())
+        kids.append(len(objects))
+    objects[1] = "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+        " ".join("{} 0 R".format(k) for k in kids), len(kids)).encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % (i + 1) + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def resume_pdf(seed: int, n_pages: int) -> bytes:
+    return make_pdf(resume_pages(seed, n_pages))
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+run.py - micro-benchmarks for the analysis hot path
+
+    cd backend
+    python -m benchmarks.run --out benchmarks/baseline.json          # record a baseline
+    python -m benchmarks.run --compare benchmarks/baseline.json      # flag slowdowns (exit 1)
+
+Each stage is timed in isolation on the synthetic corpus (1-20 page PDFs, short
+to long JDs), then the whole /analyze route is driven through the ASGI app in
+process. The app runs inside a throwaway working directory so uploads, caches
+and the SQLite file never touch the real ones.
+"""
+import os, sys, json, time, asyncio, argparse, platform, statistics, tempfile
+
+from .corpus import resume_pdf, resume_text, job_description
+
+PAGE_COUNTS = (1, 5, 20)
+JD_WORDS = (30, 150, 600)
+
+def _prepare_env(workdir: str):
+    os.chdir(workdir)
+    os.environ.setdefault("ANALYSES_DB", os.path.join(workdir, "analyses.db"))
+    os.environ.setdefault("CACHE_DIR", os.path.join(workdir, "cache"))
+
+def time_call(fn, number: int, repeat: int) -> dict:
+    """Per-call seconds: min and median over `repeat` rounds of `number` calls."""
+    fn()  # warm-up
+    rounds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - t0) / number)
+    return {"min_s": min(rounds), "median_s": statistics.median(rounds), "number": number, "repeat": repeat}
+
+async def asgi_post(app, path: str, payload: dict):
+    """Minimal in-process ASGI client: one JSON POST, returns (status, body bytes)."""
+    body = json.dumps(payload).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "client": ("bench", 0), "server": ("bench", 80),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    sent = {"done": False}
+    result = {"status": None, "body": b""}
+
+    async def receive():
+        if not sent["done"]:
+            sent["done"] = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            result["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return result["status"], result["body"]
+
+def run_benchmarks(quick: bool = False) -> dict:
+    from app import main, analyzer, analytics
+
+    number, repeat = (3, 3) if quick else (10, 5)
+    results = {}
+
+    pdf_paths = {}
+    for pages in PAGE_COUNTS:
+        pdf_id = f"bench_{pages}p.pdf"
+        path = os.path.join(main.UPLOAD_DIR, pdf_id)
+        with open(path, "wb") as f:
+            f.write(resume_pdf(seed=pages, n_pages=pages))
+        pdf_paths[pages] = (pdf_id, path)
+    texts = {pages: resume_text(seed=pages, n_pages=pages) for pages in PAGE_COUNTS}
+    jds = {n: job_description(seed=n, n_words=n) for n in JD_WORDS}
+
+    for pages in PAGE_COUNTS:
+        path = pdf_paths[pages][1]
+        text = texts[pages]
+        pdf_number = max(1, number // (2 if pages >= 20 else 1))
+        results[f"extract_text_from_pdf[{pages}p]"] = time_call(lambda: main.extract_text_from_pdf(path), pdf_number, repeat)
+        results[f"tokenize[{pages}p]"] = time_call(lambda: main.tokenize(text), number, repeat)
+        results[f"find_skills[{pages}p]"] = time_call(
+            lambda: main.find_skills(text), number, repeat)
+        results[f"flesch_reading_ease[{pages}p]"] = time_call(lambda: analytics.flesch_reading_ease(text), number, repeat)
+        results[f"text_stats[{pages}p]"] = time_call(lambda: analytics.text_stats(text), number, repeat)
+        results[f"analyzer.analyze_resume[{pages}p]"] = time_call(
+            lambda: analyzer.analyze_resume(pdf_text=text, job_description=jds[150]), number, repeat)
+
+    text = texts[5]
+    resume_tokens = main.tokenize(text)
+    tech = main.find_skills(text, "tech")
+    soft = main.find_skills(text, "soft")
+    for n in JD_WORDS:
+        jd = jds[n]
+        jd_tokens = main.tokenize(jd)
+        targets = main.get_job_skill_targets(jd)
+        missing = [s for s in targets if s not in tech and s not in soft]
+        similarity = main.jaccard_similarity(resume_tokens, jd_tokens)
+        results[f"compute_ats_score[5p,jd{n}]"] = time_call(lambda: main.compute_ats_score(
+            job_targets=targets, missing_skills=missing, resume_tokens=resume_tokens, jd_tokens=jd_tokens,
+            resume_skills_count=len(tech) + len(soft), resume_length=len(text)), number, repeat)
+        results[f"build_suggestions[5p,jd{n}]"] = time_call(lambda: main.build_suggestions(
+            job_desc=jd, job_targets=targets, missing_skills=missing, tech_found=tech, soft_found=soft,
+            resume_length=len(text), similarity=similarity), number, repeat)
+
+    loop = asyncio.new_event_loop()
+    try:
+        for pages in PAGE_COUNTS:
+            pdf_id = pdf_paths[pages][0]
+            for label, force in (("full", True), ("memo", False)):
+                def call():
+                    status, body = loop.run_until_complete(asgi_post(
+                        main.app, "/analyze", {"pdf_id": pdf_id, "job_description": jds[150], "force": force}))
+                    if status != 200:
+                        raise RuntimeError(f"/analyze returned {status}: {body[:200]!r}")
+                results[f"route/analyze[{pages}p,{label}]"] = time_call(call, number, repeat)
+    finally:
+        main.analysis_pool.shutdown()
+        loop.close()
+    return results
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Names whose median got slower than baseline by more than `threshold` (0.2 = 20%)."""
+    rows = []
+    for name, cur in sorted(current.items()):
+        base = baseline.get(name)
+        if not base or base["median_s"] <= 0:
+            continue
+        ratio = cur["median_s"] / base["median_s"]
+        rows.append((name, base["median_s"], cur["median_s"], ratio, ratio > 1.0 + threshold))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resume analyzer hot-path benchmarks")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown ratio (default 0.25)")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations")
+    args = parser.parse_args(argv)
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out_path = os.path.abspath(args.out) if args.out else None
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+
+    with tempfile.TemporaryDirectory(prefix="resume-bench-") as workdir:
+        cwd = os.getcwd()
+        _prepare_env(workdir)
+        try:
+            results = run_benchmarks(quick=args.quick)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": args.quick},
+        "results": results,
+    }
+    width = max(len(n) for n in results)
+    for name, r in results.items():
+        print(f"{name:<{width}}  median {r['median_s'] * 1000:9.3f} ms   min {r['min_s'] * 1000:9.3f} ms")
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {out_path}")
+
+    if compare_path:
+        with open(compare_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        rows = compare(results, baseline, args.threshold)
+        regressions = [r for r in rows if r[4]]
+        print()
+        for name, base, cur, ratio, slow in rows:
+            flag = "  SLOWER" if slow else ""
+            print(f"{name:<{width}}  {base * 1000:9.3f} -> {cur * 1000:9.3f} ms  x{ratio:5.2f}{flag}")
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slowed down by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+conftest.py - run the backend against a throwaway working directory
+app.main creates uploads/, cache/ and the SQLite file relative to the working
+directory (or from env) at import time, so both are pointed at a temp dir first.
+"""
+import os, sys, tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+WORKDIR = tempfile.mkdtemp(prefix="resume-tests-")
+os.chdir(WORKDIR)
+os.environ.setdefault("ANALYSES_DB", os.path.join(WORKDIR, "analyses.db"))
+os.environ.setdefault("CACHE_DIR", os.path.join(WORKDIR, "cache"))
+os.environ.setdefault("EMBED_SIDECAR_SOCKET", "")
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import time
+
+from app import db_store
+
+def count():
+    return db_store._conn().execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+
+def test_row_cap_keeps_the_newest(monkeypatch):
+    monkeypatch.setattr(db_store, "MEMO_MAX_ROWS", 5)
+    monkeypatch.setattr(db_store, "MEMO_PRUNE_EVERY", 1)
+    for i in range(12):
+        db_store.put_cached_result(f"cap{i}", {"taxonomy_version": "v1", "ats_score": i})
+    assert count() == 5
+    assert db_store.get_cached_result("cap11")["ats_score"] == 11
+    assert db_store.get_cached_result("cap0") is None
+
+def test_expired_rows_are_pruned(monkeypatch):
+    monkeypatch.setattr(db_store, "MEMO_PRUNE_EVERY", 1000000)
+    db_store.put_cached_result("old", {"taxonomy_version": "v1"})
+    conn = db_store._conn()
+    with conn:
+        conn.execute("UPDATE analysis_cache SET created_ts=? WHERE key='old'", (time.time() - 2 * db_store.MEMO_TTL_SECONDS,))
+    db_store.put_cached_result("fresh", {"taxonomy_version": "v1"})
+    assert db_store.get_cached_result("old") is not None  # not due yet
+    assert db_store.prune_cached_results() >= 1
+    assert db_store.get_cached_result("old") is None
+    assert db_store.get_cached_result("fresh") is not None
+
+def test_taxonomy_version_change_drops_old_rows(monkeypatch):
+    monkeypatch.setattr(db_store, "MEMO_PRUNE_EVERY", 1000000)
+    db_store.put_cached_result("a", {"taxonomy_version": "v1"})
+    db_store.put_cached_result("b", {"taxonomy_version": "v1"})
+    db_store.put_cached_result("c", {"taxonomy_version": "v2"})
+    assert db_store.get_cached_result("a") is None and db_store.get_cached_result("b") is None
+    assert db_store.get_cached_result("c") is not None
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import time, uuid
+
+from app import db_store
+
+def new_run(n):
+    bulk_id = uuid.uuid4().hex
+    db_store.create_bulk_run(bulk_id, "job", [f"pdf{i}" for i in range(n)])
+    return bulk_id
+
+def drain(owner="other"):
+    """Lease away whatever earlier tests left claimable so each test sees only its own run."""
+    while db_store.claim_bulk_items(owner, 100, 3600, max_attempts=100):
+        pass
+
+def expire_leases(bulk_id):
+    conn = db_store._conn()
+    with conn:
+        conn.execute("UPDATE bulk_items SET lease_until=? WHERE bulk_id=? AND status='leased'", (time.time() - 1, bulk_id))
+
+def test_claim_lease_and_finish():
+    drain()
+    assert not db_store.bulk_items_claimable()
+    bulk_id = new_run(3)
+    assert db_store.bulk_items_claimable()
+    first = db_store.claim_bulk_items("w1", 2, 60)
+    assert [i["seq"] for i in first] == [0, 1]
+    assert db_store.get_bulk_run(bulk_id)["status"] == "running"
+    assert [i["seq"] for i in db_store.claim_bulk_items("w2", 5, 60)] == [2]
+    assert not db_store.bulk_items_claimable()  # everything is leased and the leases are live
+
+    assert db_store.finish_bulk_item(bulk_id, 0, "w1", {"pdf_id": "pdf0"})
+    assert not db_store.finish_bulk_item(bulk_id, 2, "w1", {"pdf_id": "pdf2"})  # w2 holds that lease
+    assert db_store.finish_bulk_item(bulk_id, 2, "w2", {"pdf_id": "pdf2", "error": "x"}, ok=False)
+    assert db_store.finish_bulk_item(bulk_id, 1, "w1", {"pdf_id": "pdf1"})
+    run = db_store.get_bulk_run(bulk_id)
+    assert (run["status"], run["completed"], run["failed"]) == ("done", 2, 1)
+    assert [(n, seq) for n, seq, _ in db_store.bulk_results(bulk_id)] == [(1, 0), (2, 2), (3, 1)]
+    assert [seq for _, seq, _ in db_store.bulk_results(bulk_id, after=2)] == [1]
+
+def test_expired_lease_is_reclaimed_then_given_up():
+    drain()
+    bulk_id = new_run(1)
+    assert db_store.claim_bulk_items("w1", 1, 60, max_attempts=2)
+    expire_leases(bulk_id)
+    assert db_store.bulk_items_claimable()
+    assert [i["seq"] for i in db_store.claim_bulk_items("w2", 1, 60, max_attempts=2)] == [0]
+    assert not db_store.finish_bulk_item(bulk_id, 0, "w1", {"pdf_id": "pdf0"})  # w1 lost it
+    expire_leases(bulk_id)
+    assert db_store.claim_bulk_items("w3", 1, 60, max_attempts=2) == []
+    run = db_store.get_bulk_run(bulk_id)
+    assert (run["status"], run["failed"]) == ("done", 1)
+    assert "Gave up after 2" in db_store.bulk_results(bulk_id)[0][2]["error"]
+
+def test_release_does_not_count_an_attempt():
+    drain()
+    bulk_id = new_run(1)
+    for _ in range(3):
+        assert db_store.claim_bulk_items("w1", 1, 60, max_attempts=1)
+        db_store.release_bulk_item(bulk_id, 0, "w1")
+    item, = db_store.claim_bulk_items("w1", 1, 60, max_attempts=1)
+    assert db_store.finish_bulk_item(bulk_id, item["seq"], "w1", {"pdf_id": "pdf0"})
+
+def test_cancel_keeps_leased_items_reporting():
+    drain()
+    bulk_id = new_run(4)
+    leased = db_store.claim_bulk_items("w1", 2, 60)
+    assert db_store.cancel_bulk_run(bulk_id)
+    assert not db_store.cancel_bulk_run(bulk_id)
+    assert not db_store.bulk_items_claimable()
+    assert db_store.live_bulk_leases(bulk_id) == 2
+    assert db_store.finish_bulk_item(bulk_id, leased[0]["seq"], "w1", {"pdf_id": "pdf0"})
+    assert db_store.live_bulk_leases(bulk_id) == 1
+    expire_leases(bulk_id)  # a worker that died does not hold the stream open
+    assert db_store.live_bulk_leases(bulk_id) == 0
+    run = db_store.get_bulk_run(bulk_id)
+    assert (run["status"], run["completed"]) == ("cancelled", 1)
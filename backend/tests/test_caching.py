@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import os
+
+from app.caching import DiskCache
+
+def test_disk_cache_evicts_oldest_down_to_low_water(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), max_bytes=1000, suffix=".txt", low_water=0.5)
+    for i in range(10):
+        cache.put(f"k{i:02d}", b"x" * 100)
+        os.utime(cache._path(f"k{i:02d}"), (i, i))  # distinct, increasing mtimes
+    assert cache.stats()["evictions"] == 0
+    stats_calls = []
+    real = os.path.getmtime
+    monkeypatch.setattr(os.path, "getmtime", lambda p: stats_calls.append(p) or real(p))
+
+    cache.put("k10", b"x" * 100)  # 1100 bytes > 1000: evict the oldest down to 500
+    st = cache.stats()
+    assert st["bytes"] <= 500 and st["evictions"] == 6
+    assert cache.get("k00") is None and cache.get("k10") is not None
+    scans = len(stats_calls)
+
+    for i in range(11, 16):  # back up to 1000 bytes: no new scan
+        cache.put(f"k{i}", b"x" * 100)
+    assert cache.stats()["evictions"] == 6
+    assert len(stats_calls) - scans == 5  # one getmtime per put, none for a full rescan
+
+def test_disk_cache_skips_oversized_values(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    cache.put("big", b"x" * 11)
+    assert cache.get("big") is None and cache.stats()["entries"] == 0
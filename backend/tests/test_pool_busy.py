@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from fastapi.testclient import TestClient
+
+from app import main
+from app.workers import PoolSaturated
+
+def test_saturated_pool_answers_503_with_retry_after(monkeypatch):
+    async def saturated(*args):
+        raise PoolSaturated("analysis queue is full")
+
+    monkeypatch.setattr(main.analysis_pool, "run", saturated)
+    monkeypatch.setattr(main, "require_upload", lambda pdf_id: ("/nonexistent.pdf", "0" * 64))
+    client = TestClient(main.app)
+    r = client.post("/analyze", json={"pdf_id": "x", "job_description": "python developer", "force": True})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == main.RETRY_AFTER_SECONDS
+    assert r.json()["detail"] == main.pool_busy().detail
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from app import main, scoring_matrix
+
+SKILL_WORDS = ["python", "java", "c++", "sql", "docker", "aws", "react", "node.js", "git", "linux",
+               "machine learning", "communication", "teamwork", "leadership", "kubernetes", "html", "css"]
+FILLER = "built shipped services for customers and improved reliability across teams".split()
+
+def resumes():
+    out = [""]  # no text at all
+    for n in range(12):
+        skills = SKILL_WORDS[n % 5:n % 5 + n + 1]
+        body = " ".join(FILLER[(n + i) % len(FILLER)] for i in range(40 * n + 5))
+        out.append(f"Engineer {n}. Skills: {', '.join(skills)}.\n{body}")
+    return out
+
+JOBS = [
+    "Python developer with docker, aws and sql. Teamwork and communication.",
+    "Senior Java and C++ engineer, linux, git",
+    "Frontend: react, node.js, html, css, plus leadership",
+    "We value curiosity and a calm, friendly office",  # no skill targets: richness-only branch
+    "",
+]
+
+@pytest.mark.parametrize("backend", ["sparse", "dense"])
+def test_matrix_matches_per_pair_scoring(monkeypatch, backend):
+    if backend == "sparse" and scoring_matrix.sparse is None:
+        pytest.skip("scipy is not installed")
+    if backend == "dense":
+        monkeypatch.setattr(scoring_matrix, "sparse", None)
+    texts = resumes()
+    profiles = [main.build_job_profile(main.normalize_jd(jd)) for jd in JOBS]
+    assert not profiles[3]["targets"]
+    matrix = scoring_matrix.score_matrix([main.resume_features(t) for t in texts], profiles)
+    assert matrix["ats_score"].shape == (len(texts), len(JOBS))
+    for i, text in enumerate(texts):
+        for j, profile in enumerate(profiles):
+            expected = main.score_resume(text, profile)
+            assert int(matrix["ats_score"][i, j]) == expected["ats_score"], (i, j)
+            assert float(matrix["similarity"][i, j]) == expected["similarity"], (i, j)
+            assert int(matrix["matched"][i, j]) == len(profile["targets"]) - len(expected["missing_skills_job"])
+
+def test_sparse_and_dense_agree(monkeypatch):
+    if scoring_matrix.sparse is None:
+        pytest.skip("scipy is not installed")
+    features = [main.resume_features(t) for t in resumes()]
+    profiles = [main.build_job_profile(main.normalize_jd(jd)) for jd in JOBS]
+    sparse_result = scoring_matrix.score_matrix(features, profiles)
+    monkeypatch.setattr(scoring_matrix, "sparse", None)
+    dense_result = scoring_matrix.score_matrix(features, profiles)
+    for key in ("similarity", "matched", "ats_score"):
+        assert (sparse_result[key] == dense_result[key]).all()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import math
+
+from app.search_index import SearchIndex
+
+DOCS = {
+    "a": {"python": 3, "django": 1},
+    "b": {"python": 1, "java": 4, "spring": 2},
+    "c": {"java": 1, "kotlin": 2},
+    "d": {"rust": 2},
+}
+
+def bm25(docs, query, k1=1.2, b=0.75):
+    lengths = {k: sum(tf.values()) for k, tf in docs.items()}
+    avgdl = sum(lengths.values()) / len(docs)
+    scores = {}
+    for term in set(query):
+        df = sum(1 for tf in docs.values() if term in tf)
+        if not df:
+            continue
+        idf = math.log(1.0 + (len(docs) - df + 0.5) / (df + 0.5))
+        for key, tf in docs.items():
+            if term in tf:
+                n = tf[term]
+                s = idf * n * (k1 + 1) / (n + k1 * (1 - b + b * lengths[key] / avgdl))
+                scores[key] = scores.get(key, 0.0) + s
+    return sorted(((k, round(s, 4)) for k, s in scores.items()), key=lambda h: h[1], reverse=True)
+
+def build(root, compact_threshold=2000):
+    index = SearchIndex(str(root), compact_threshold=compact_threshold)
+    for key, tf in DOCS.items():
+        index.add(key, tf)
+    return index
+
+def test_bm25_matches_reference(tmp_path):
+    index = build(tmp_path)
+    for query in (["python"], ["java", "python"], ["kotlin", "rust"], ["missing"]):
+        assert index.search(query, top_k=10) == bm25(DOCS, query)
+
+def test_ranking_survives_compaction_and_deletes(tmp_path):
+    index = build(tmp_path)
+    index.compact()
+    assert index.search(["python", "java"], top_k=2) == bm25(DOCS, ["python", "java"])[:2]
+    assert index.delete("b")
+    index.add("e", {"python": 5})  # delta document next to base segment ones
+    docs = {k: v for k, v in DOCS.items() if k != "b"}
+    docs["e"] = {"python": 5}
+    assert index.search(["python"], top_k=10) == bm25(docs, ["python"])
+    assert index.stats()["documents"] == 4
+
+def test_add_compacts_past_threshold_and_reopens(tmp_path):
+    index = build(tmp_path, compact_threshold=3)
+    assert index.stats()["generation"] >= 1
+    reopened = SearchIndex(str(tmp_path))
+    assert reopened.search(["java"], top_k=10) == bm25(DOCS, ["java"])
+    assert reopened.contains("d") and not reopened.contains("z")
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from app import semantic
+
+def test_top_k_orders_float_scores():
+    scores = np.array([0.4, 0.1, 0.2, 0.3, 0.5, 0.45, 0.0, 0.05, 0.15, 0.9])
+    assert list(semantic.top_k_indices(scores, 3)) == [9, 4, 5]
+
+def test_top_k_breaks_ties_by_candidate_order():
+    scores = np.array([0.5, 0.7, 0.5, 0.7, -0.2])
+    assert list(semantic.top_k_indices(scores, 5)) == [1, 3, 0, 2, 4]
+    assert list(semantic.top_k_indices(np.array([3, 1, 3]), 2)) == [0, 2]
+    assert list(semantic.top_k_indices(np.array([0.2, 0.5, 0.5, 0.5, 0.1]), 2)) == [1, 2]
+    assert list(semantic.top_k_indices(np.array([0.2]), 0)) == []
+
+def test_top_k_matches_a_full_stable_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        scores = rng.integers(0, 5, size=rng.integers(1, 40)) / 4.0
+        k = int(rng.integers(0, len(scores) + 2))
+        full = sorted(range(len(scores)), key=lambda i: (-scores[i], i))
+        assert list(semantic.top_k_indices(scores, k)) == full[:k]
+
+def test_evidence_ranks_model_scores(monkeypatch):
+    # chunk vectors are unit axes; each candidate's cosine to its best chunk is set directly
+    doc = "Built Python services on Kubernetes.\nLed a team of four engineers.\nWrote SQL reports weekly."
+    chunks = semantic.split_chunks(doc)
+    candidates = ["c%d" % i for i in range(10)]
+    best_sim = [0.4, 0.1, 0.2, 0.3, 0.5, 0.45, 0.0, 0.05, 0.15, 0.9]
+    dim = len(chunks) + 1
+
+    def fake_embed(texts, persist_from=0):
+        out = np.zeros((len(texts), dim), dtype=np.float32)
+        for i in range(len(chunks)):
+            out[i, i] = 1.0
+        for j, s in enumerate(best_sim):
+            row = len(chunks) + j
+            out[row, j % len(chunks)] = s
+            out[row, -1] = np.sqrt(1 - s * s)
+        return out
+
+    monkeypatch.setattr(semantic, "model_available", lambda: True)
+    monkeypatch.setattr(semantic, "embed_texts", fake_embed)
+    result = semantic.semantic_evidence(doc, candidates, top_k=3)
+    assert [(m["skill"], m["score"]) for m in result] == [("c9", 90), ("c4", 50), ("c5", 45)]
+    assert result[0]["evidence"] == chunks[9 % len(chunks)]
+
+def test_lexical_fallback_scores_token_overlap(monkeypatch):
+    monkeypatch.setattr(semantic, "model_available", lambda: False)
+    result = semantic.semantic_matches("I build python services.\nLed a team.", ["python", "rust", "team lead"])
+    assert result == [("python", 100), ("team lead", 50), ("rust", 0)]
+
+def test_only_candidate_vectors_are_stored(monkeypatch, tmp_path):
+    store = semantic.EmbeddingStore(str(tmp_path))
+    monkeypatch.setattr(semantic, "_STORE", store)
+    monkeypatch.setattr(semantic, "model_available", lambda: True)
+    encoded = []
+
+    def fake_encode(texts, model_name):
+        encoded.extend(texts)
+        return semantic.hashed_vectors(texts, 16)
+
+    monkeypatch.setattr(semantic.embed_sidecar, "encode", fake_encode)
+    doc = "Built Python services on Kubernetes for the payments team.\nLed a team of four engineers on the platform."
+    assert semantic.semantic_evidence(doc, ["python", "leadership"], top_k=2)
+    assert store.stats()["rows"] == 2
+    assert store.lookup([semantic.text_key("python"), semantic.text_key("leadership")])[1] == []
+
+    encoded.clear()
+    semantic.semantic_evidence(doc, ["python", "leadership"], top_k=2)
+    assert encoded == semantic.split_chunks(doc)  # candidates come from the store, chunks are re-encoded
+    semantic.document_vectors([doc], persist=False)
+    assert store.stats()["rows"] == 2
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from app.skill_matcher import SkillMatcher
+
+TERMS = ["c", "c++", "c#", ".net", "asp.net", "node", "node.js", "js", "java", "javascript",
+         "go", "r", "sql", "nosql", "machine learning", "learning", "react", "react native", "ci/cd"]
+
+def names(text, terms=TERMS):
+    return sorted({h[0] for h in SkillMatcher(terms).find_all(text)})
+
+def test_symbols_glue_onto_terms():
+    assert names("C++ developer") == ["c++"]
+    assert names("C# and .NET") == [".net", "c#"]
+    assert names("c, c++ and c#") == ["c", "c#", "c++"]
+    assert names("C+ grade") == []  # "+" glues, so neither c nor c++
+    assert names("ASP.NET MVC") == [".net", "asp.net"]
+
+def test_dotted_names():
+    assert names("Node.js services") == ["js", "node", "node.js"]
+    assert names("node.jsx") == ["node"]
+    assert names("nodejs") == []
+    assert names("CI/CD pipelines") == ["ci/cd"]
+
+def test_no_matches_inside_other_words():
+    assert names("JavaScript") == ["javascript"]
+    assert names("Django, Golang, Rust, MySQL") == []
+    assert names("SQL-compatible") == ["sql"]
+    assert names("NoSQL stores") == ["nosql"]
+    assert names("programming, mongo, r&d, foreign") == ["r"]
+    assert names("learnings") == []
+
+def test_overlapping_phrases_report_every_term():
+    hits = SkillMatcher(TERMS).find_all("Machine Learning; React Native apps")
+    assert hits == [("machine learning", 0, 16), ("learning", 8, 16),
+                    ("react", 18, 23), ("react native", 18, 30)]
+
+def test_offsets_survive_case_folding_that_changes_length():
+    text = "İstanbul: Python, SQL"
+    hits = SkillMatcher(["python", "sql"]).find_all(text)
+    assert [(t, text[s:e]) for t, s, e in hits] == [("python", "Python"), ("sql", "SQL")]
+
+def test_empty_inputs():
+    assert SkillMatcher([]).find_all("python") == []
+    assert SkillMatcher(TERMS).find_all("") == []
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from app.vector_index import VectorIndex, SpaceMismatch
+
+def clustered(n, dim=32, clusters=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vecs = centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (vecs / np.linalg.norm(vecs, axis=1, keepdims=True)).astype(np.float32)
+
+def test_ivf_recall(tmp_path):
+    index = VectorIndex(str(tmp_path), n_probe=4, min_train=256)
+    for i, v in enumerate(clustered(600)):
+        index.add(f"doc{i}", v, "test:32")
+    stats = index.stats()
+    assert stats["lists"] > 1 and stats["trained_on"] >= 256
+    queries = clustered(20, seed=1)
+    assert index.recall(queries, top_k=10) >= 0.9
+    assert index.recall(queries, top_k=10, n_probe=stats["lists"]) == 1.0
+    hits = index.search(queries[0], top_k=5, exact=True)
+    assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+def test_deleted_vectors_are_not_returned(tmp_path):
+    index = VectorIndex(str(tmp_path))
+    vecs = clustered(10)
+    for i, v in enumerate(vecs):
+        index.add(f"doc{i}", v, "test:32")
+    assert index.search(vecs[3], top_k=1)[0][0] == "doc3"
+    assert index.delete("doc3") and not index.delete("doc3")
+    assert "doc3" not in [k for k, _ in index.search(vecs[3], top_k=10)]
+
+def test_space_mismatch_and_reset_seen_by_other_instances(tmp_path):
+    a, b = VectorIndex(str(tmp_path)), VectorIndex(str(tmp_path))
+    vec = clustered(1)[0]
+    a.add("x", vec, "test:32")
+    assert b.contains("x") and b.space == "test:32"
+    with pytest.raises(SpaceMismatch):
+        b.search(vec, space="other:32")
+
+    a.reset()
+    a.add("y", vec[:16] / np.linalg.norm(vec[:16]), "other:16")
+    # b still had the old space and log offset cached; it must pick up the reset
+    assert b.search(vec[:16], top_k=5, space="other:16")[0][0] == "y"
+    assert not b.contains("x") and b.stats()["dim"] == 16
+    b.add("z", vec[:16] / np.linalg.norm(vec[:16]), "other:16")
+    assert a.contains("z")
+
+def test_n_probe_must_be_positive(tmp_path):
+    index = VectorIndex(str(tmp_path), min_train=16)
+    vecs = clustered(40)
+    for i, v in enumerate(vecs):
+        index.add(f"doc{i}", v, "test:32")
+    for bad in (0, -3):
+        with pytest.raises(ValueError):
+            index.search(vecs[0], n_probe=bad)
+    with pytest.raises(ValueError):
+        VectorIndex(str(tmp_path), n_probe=0)
+    assert index.search(vecs[0], top_k=1, n_probe=1)[0][0] == "doc0"
+
+def test_semantic_search_rejects_bad_n_probe():
+    from fastapi.testclient import TestClient
+    from app import main
+    client = TestClient(main.app)
+    for bad in (0, -1):
+        r = client.post("/search/semantic", json={"job_description": "python", "n_probe": bad})
+        assert r.status_code == 422
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import asyncio, os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.workers import AnalysisPool
+
+def square(x):
+    return x * x
+
+def die():
+    os._exit(1)  # what an OOM kill or a segfault looks like to the parent
+
+def test_pool_recovers_after_a_worker_dies():
+    pool = AnalysisPool(max_workers=2, max_queue=4)
+
+    async def scenario():
+        assert await pool.run(square, 3) == 9
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(die)
+        assert await pool.run(square, 4) == 16
+        assert await pool.run_many(square, [(1,), (2,)]) == [1, 4]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert stats["restarts"] == 1 and stats["failed"] == 1 and stats["completed"] == 4